@@ -18,34 +18,31 @@ Time 5:
 import sys
 import cv2
 import json
+import argparse
+import time
+import queue
+import threading
 import numpy as np
 from datetime import datetime
 from pathlib import Path
 from typing import Optional, List, Dict, Tuple
-from collections import deque
+from collections import deque, OrderedDict
 
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QLabel, QComboBox, QLineEdit,
-    QCheckBox, QSlider, QGroupBox, QScrollArea, QListWidget,
+    QCheckBox, QSlider, QGroupBox, QScrollArea, QListView,
     QSplitter, QFileDialog, QFrame, QGridLayout, QMessageBox
 )
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer, QSize, QMutex
-from PyQt5.QtGui import QImage, QPixmap, QFont, QIntValidator
+from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer, QSize, QMutex, QAbstractListModel, QModelIndex
+from PyQt5.QtGui import QImage, QPixmap, QFont, QIntValidator, QPainter, QPen, QColor
 
-try:
-    from pyzbar import pyzbar
-    PYZBAR_AVAILABLE = True
-except ImportError:
-    PYZBAR_AVAILABLE = False
-    print("⚠️ pyzbar não instalado. Use: pip install pyzbar")
-
-try:
-    from pylibdmtx import pylibdmtx
-    PYLIBDMTX_AVAILABLE = True
-except ImportError:
-    PYLIBDMTX_AVAILABLE = False
-    print("⚠️ pylibdmtx não instalado. Use: pip install pylibdmtx")
+from detection_engine import (DetectionEngine, MotionGate, StageTimer, code_variant, FALLBACK_MIN_LIKELIHOOD,
+                              FALLBACK_INTERVAL_MS, DEFAULT_DEADLINE_MS, PYZBAR_AVAILABLE, PYLIBDMTX_AVAILABLE)
+from frame_grabber import LatestFrameGrabber
+from frame_sources import FrameSource, CameraSource, VideoFileSource, ImageFolderSource, SyntheticSource, open_source
+from history_store import HistoryStore
+from metrics import MetricsRegistry, MetricsServer, CYCLE_BUCKETS_S, DEFAULT_METRICS_PORT
 
 
 # ==================== CONFIGURAÇÕES OTIMIZADAS PARA PCYES FHD-03 ====================
@@ -63,12 +60,41 @@ DEFAULT_CONFIG = {
     "beta": 0
 }
 
+# Overlay de desempenho: etapas exibidas (pipeline da GUI e motor) e recálculo
+STATS_OVERLAY_STAGES = ("read", "motion", "detect", "thumbnails", "preview", "update_frame",
+                        "localize", "rectify", "zbar", "dmtx", "fallback")
+STATS_OVERLAY_REFRESH_S = 0.5
+
+# Preview: reduzido na thread de apresentação para o tamanho do QLabel de vídeo
+PREVIEW_SIZE = (640, 480)
+# Frequência com que a GUI busca o preview mais recente (independe da decodificação)
+PREVIEW_REFRESH_HZ = 30
+# Qt >= 5.14 aceita BGR direto (sem cvtColor por frame)
+QIMAGE_FORMAT_BGR888 = getattr(QImage, 'Format_BGR888', None)
+
+# Modo de miniatura → versão da região do código (detection_engine.code_variant)
+THUMBNAIL_VARIANTS = {
+    "Binarizada": 'binary',
+    "Escala de Cinza": 'gray',
+    "Enhanced (CLAHE)": 'enhanced',
+}
+
+# Miniaturas: reduzidas na thread de decodificação e exibidas em blocos reutilizados
+THUMBNAIL_SIZE = (120, 100)     # Área da imagem na miniatura (largura, altura)
+THUMBNAIL_POOL_SIZE = 8         # Blocos fixos no grid (2 colunas)
+
+# Histórico: detecções entram em lote; só as recentes ficam em memória, o resto vem do disco
+HISTORY_FLUSH_MS = 250          # Intervalo entre inserções em lote na lista
+HISTORY_WINDOW_ROWS = 1000      # Linhas na lista (e em memória) enquanto ela segue o fim
+HISTORY_MAX_ROWS = 4000         # Limite da lista em qualquer posição de rolagem
+HISTORY_PAGE_ROWS = 256         # Entradas lidas do disco por página
+HISTORY_PAGE_CACHE = 8          # Páginas antigas mantidas em memória (LRU)
+
 
 # ==================== THREAD DE CAPTURA E PROCESSAMENTO ====================
 class CameraThread(QThread):
     """Thread responsável pela captura de vídeo e detecção de códigos"""
     
-    frame_ready = pyqtSignal(np.ndarray)
     code_detected = pyqtSignal(dict)
     inspection_complete = pyqtSignal(bool, int)
     
@@ -93,41 +119,68 @@ class CameraThread(QThread):
         # Buffer de detecção para evitar duplicatas
         self.recent_detections = deque(maxlen=30)
         
+        # Estágios captura → decodificação → apresentação
+        self.grabber = None        # LatestFrameGrabber (criado em run)
+        self.last_frame_timestamp = 0.0  # time.monotonic() da captura do último frame
+        self.render_queue = queue.Queue(maxsize=2)
+        self.frames_dropped = 0    # Frames capturados e nunca decodificados
+        self.previews_dropped = 0  # Previews descartados antes da apresentação
+        # ✅ Preview mais recente, buscado pela GUI no seu ritmo (QTimer)
+        # Um sinal por frame acumularia na fila de eventos do Qt com a GUI ocupada
+        self.preview_mailbox = PreviewMailbox()
+        
+        # Motor de detecção (independente de Qt)
+        # DataMatrix em thread própria: busca lenta não trava o vídeo
+        # Fallback no frame completo limitado (estação vazia não consome CPU)
+        # Prazo de um período de frame: frame difícil não congela o preview
+        self.engine = DetectionEngine(dmtx_async=True, tracking=True, result_cache=True,
+                                      fallback_min_likelihood=FALLBACK_MIN_LIKELIHOOD,
+                                      fallback_interval_ms=FALLBACK_INTERVAL_MS,
+                                      deadline_ms=DEFAULT_DEADLINE_MS)
+        
+        # ✅ Filtro de movimento: cena parada reaproveita o último resultado
+        self.motion_gate = MotionGate()
+        self.last_codes: List[Dict] = []
+        
+        # ✅ Tempos por etapa do pipeline (as etapas internas do motor ficam em engine.stage_timer)
+        self.stage_timer = StageTimer()
+        self.show_stats = False                 # Overlay de FPS e tempos no vídeo
+        self.decode_times = deque(maxlen=30)    # Instantes dos últimos frames decodificados
+        self.render_times = deque(maxlen=30)    # Instantes dos últimos previews exibidos
+        self._stats_lines: List[str] = []
+        self._stats_updated = 0.0
+        self.preview_size = PREVIEW_SIZE        # Tamanho máximo do preview (largura, altura)
+        
+        # Métricas para o monitoramento da planta (None = desativado, custo zero)
+        self.metrics: Optional[MetricsRegistry] = None
+        self.camera_reconnects = 0      # Mesma fonte aberta de novo (ex: câmera que caiu)
+        self._last_source: Optional[str] = None     # Descrição da última fonte aberta
+        self._grabbed_before = 0        # Totais de execuções anteriores do grabber
+        self._skipped_before = 0
+        
     def set_camera(self, index: int) -> bool:
         """Configura e abre a câmera com otimizações para Pcyes FHD-03"""
         self.camera_index = index
+        return self.set_source(CameraSource(index))
+    
+    def set_source(self, source: FrameSource) -> bool:
+        """Usa uma fonte de frames (câmera, vídeo, pasta de imagens ou sintética)"""
         if self.camera is not None:
             self.camera.release()
         
-        self.camera = cv2.VideoCapture(index, cv2.CAP_V4L2)  # ✅ Usa V4L2 no Linux
+        self.camera = source
         if not self.camera.isOpened():
-            # Tenta com backend padrão se V4L2 falhar
-            self.camera = cv2.VideoCapture(index)
-            if not self.camera.isOpened():
-                return False
-        
-        # ✅ OTIMIZADO: Configuração específica para FHD-03
-        # Usa 720p para melhor performance (a detecção não precisa de 1080p)
-        self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-        self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-        self.camera.set(cv2.CAP_PROP_FPS, 30)
-        self.camera.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-        
-        # ✅ IMPORTANTE: Desativa autofoco inicial para evitar delay
-        # Será reativado pelos parâmetros do usuário
-        self.camera.set(cv2.CAP_PROP_AUTOFOCUS, 0)
-        
-        # ✅ Configura codec MJPEG para melhor performance
-        self.camera.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
-        
-        # Aguarda 500ms para câmera estabilizar
-        import time
-        time.sleep(0.5)
-        
-        # Aplica configurações iniciais
+            source.release()
+            self.camera = None
+            return False
+        if source.description == self._last_source:
+            self.camera_reconnects += 1
+        self._last_source = source.description
+        
+        # Aplica configurações iniciais (ignoradas por fontes que não são câmera)
         self.apply_pdi_params()
         
-        print(f"✅ Câmera configurada: {int(self.camera.get(cv2.CAP_PROP_FRAME_WIDTH))}x{int(self.camera.get(cv2.CAP_PROP_FRAME_HEIGHT))} @ {int(self.camera.get(cv2.CAP_PROP_FPS))}fps")
+        print(f"✅ {source.description} configurada: {int(self.camera.get(cv2.CAP_PROP_FRAME_WIDTH))}x{int(self.camera.get(cv2.CAP_PROP_FRAME_HEIGHT))} @ {int(self.camera.get(cv2.CAP_PROP_FPS))}fps")
         
         return True
     
@@ -184,6 +237,7 @@ class CameraThread(QThread):
         self.pdi_params[param] = value
         self.params_changed = True
         self.params_mutex.unlock()
+        self.motion_gate.invalidate()  # Boost/ajustes mudam a imagem detectada
     
     def start_inspection(self, expected: int, timeout: int):
         """Inicia um ciclo de inspeção"""
@@ -202,327 +256,11 @@ class CameraThread(QThread):
 
     def is_valid_code(self, code_type: str, code_data: str, bbox: tuple) -> bool:
         """Valida se o código detectado é legítimo (não é ruído)"""
-        x, y, w, h = bbox
-        
-        # ✅ REGRA 1: Tamanho mínimo REDUZIDO (permite códigos distantes)
-        if w < 15 or h < 8:  # Bem menor que antes (era 30x15) 15*8
-            return False
-        
-        # ✅ REGRA 2: Conteúdo mínimo (códigos reais têm pelo menos 3 caracteres)
-        if len(code_data) < 3:
-            return False
-        
-        # ✅ REGRA 3: Apenas caracteres imprimíveis (evita lixo binário)
-        if not all(32 <= ord(c) <= 126 for c in code_data):
-            return False
-        
-        # ✅ REGRA 4: Validação específica DataBar (causa do WARNING)
-        if code_type in ['DATABAR', 'DATABAR_EXP', 'RSS14', 'RSS_EXP']:
-            # DataBar DEVE ser numérico e ter comprimento razoável
-            if not code_data.isdigit() or len(code_data) < 10:
-                return False
-        
-        return True
+        return self.engine.is_valid_code(code_type, code_data, bbox)
     
     def detect_codes(self, frame: np.ndarray) -> List[Dict]:
-        """Detecta códigos 1D e 2D no frame com pré-processamento otimizado
-        
-        PIPELINE OTIMIZADO:
-        1. Detecção inicial (localiza códigos)
-        2. Recorte da região detectada
-        3. Retificação de perspectiva (corrige inclinação)
-        4. PDI completo na região retificada
-        5. Re-detecção com maior precisão
-        """
-        codes = []
-        
-        # ============ ETAPA 1: DETECÇÃO INICIAL (LOCALIZAÇÃO) ============
-        # Usa imagem em escala de cinza para localizar códigos rapidamente
-        gray_initial = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        
-        detected_regions = []  # Armazena regiões detectadas para processamento
-        
-        # Detecção inicial rápida com pyzbar
-        if PYZBAR_AVAILABLE:
-            try:
-                import os
-                stderr_backup = sys.stderr
-                sys.stderr = open(os.devnull, 'w')
-                
-                try:
-                    decoded_objects = pyzbar.decode(gray_initial)
-                finally:
-                    sys.stderr.close()
-                    sys.stderr = stderr_backup
-                
-                for obj in decoded_objects:
-                    try:
-                        data_key = obj.data.decode('utf-8', errors='ignore')
-                        x, y, w, h = obj.rect
-                        
-                        # Valida se não é ruído
-                        if not self.is_valid_code(obj.type, data_key, (x, y, w, h)):
-                            continue
-                        
-                        # Armazena região para processamento refinado
-                        detected_regions.append({
-                            'type': obj.type,
-                            'data': data_key,
-                            'bbox': (x, y, w, h),
-                            'polygon': obj.polygon,
-                            'method': 'initial'
-                        })
-                    except Exception:
-                        continue
-            except Exception:
-                pass
-        
-        # ============ ETAPA 2: PROCESSAMENTO REFINADO DAS REGIÕES ============
-        processed_codes = set()  # Evita duplicatas
-        
-        for region in detected_regions:
-            x, y, w, h = region['bbox']
-            polygon = region['polygon']
-            
-            # ✅ MARGEM DE SEGURANÇA: Expande região em 20% para não cortar bordas
-            margin_x = int(w * 0.2)
-            margin_y = int(h * 0.2)
-            
-            x1 = max(0, x - margin_x)
-            y1 = max(0, y - margin_y)
-            x2 = min(frame.shape[1], x + w + margin_x)
-            y2 = min(frame.shape[0], y + h + margin_y)
-            
-            # ✅ RECORTE da região detectada
-            roi = frame[y1:y2, x1:x2].copy()
-            
-            if roi.size == 0:
-                continue
-            
-            # ============ ETAPA 3: RETIFICAÇÃO DE PERSPECTIVA ============
-            try:
-                # Ajusta coordenadas do polígono para o ROI
-                polygon_adjusted = []
-                for point in polygon:
-                    px = point.x - x1
-                    py = point.y - y1
-                    polygon_adjusted.append([px, py])
-                
-                polygon_adjusted = np.array(polygon_adjusted, dtype=np.float32)
-                
-                # Calcula largura e altura do código retificado
-                # Usa a distância entre pontos para preservar proporções
-                width = int(max(
-                    np.linalg.norm(polygon_adjusted[0] - polygon_adjusted[1]),
-                    np.linalg.norm(polygon_adjusted[2] - polygon_adjusted[3])
-                ))
-                height = int(max(
-                    np.linalg.norm(polygon_adjusted[1] - polygon_adjusted[2]),
-                    np.linalg.norm(polygon_adjusted[3] - polygon_adjusted[0])
-                ))
-                
-                # ✅ TAMANHO MÍNIMO: Garante resolução suficiente para leitura
-                width = max(width, 100)
-                height = max(height, 50)
-                
-                # Pontos destino (retângulo perfeito)
-                dst_points = np.array([
-                    [0, 0],
-                    [width - 1, 0],
-                    [width - 1, height - 1],
-                    [0, height - 1]
-                ], dtype=np.float32)
-                
-                # ✅ MATRIZ DE TRANSFORMAÇÃO de perspectiva
-                matrix = cv2.getPerspectiveTransform(polygon_adjusted, dst_points)
-                
-                # ✅ RETIFICAÇÃO: Corrige distorção angular
-                rectified = cv2.warpPerspective(roi, matrix, (width, height))
-                
-                # Armazena imagem retificada original (para miniaturas)
-                rectified_original = rectified.copy()
-                
-            except Exception as e:
-                # Se retificação falhar, usa ROI original
-                print(f"⚠️ Retificação falhou: {e}")
-                rectified = roi
-                rectified_original = roi.copy()
-            
-            # ============ ETAPA 4: PIPELINE DE PDI NA REGIÃO RETIFICADA ============
-            
-            # 4.1: CLAHE (equalização adaptativa)
-            clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-            lab = cv2.cvtColor(rectified, cv2.COLOR_BGR2LAB)
-            lab[:, :, 0] = clahe.apply(lab[:, :, 0])
-            enhanced = cv2.cvtColor(lab, cv2.COLOR_LAB2BGR)
-            
-            # 4.2: Escala de cinza
-            gray = cv2.cvtColor(enhanced, cv2.COLOR_BGR2GRAY)
-            
-            # 4.3: Binarização adaptativa (CRÍTICO para códigos 1D)
-            binary = cv2.adaptiveThreshold(
-                gray, 255,
-                cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                cv2.THRESH_BINARY,
-                blockSize=11,
-                C=2
-            )
-            
-            # 4.4: Remoção de ruído
-            kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
-            denoised = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel, iterations=1)
-            
-            # 4.5: Sharpening (aguça bordas para melhor leitura)
-            # Usa filtro Unsharp Mask
-            gaussian = cv2.GaussianBlur(gray, (0, 0), 2.0)
-            sharpened = cv2.addWeighted(gray, 1.5, gaussian, -0.5, 0)
-            
-            # ✅ CACHE das versões processadas
-            self.enhanced_frame_cache = enhanced
-            self.gray_frame_cache = sharpened
-            self.binary_frame_cache = denoised
-            
-            # ============ ETAPA 5: RE-DETECÇÃO COM ALTA PRECISÃO ============
-            
-            # Tenta detectar nas versões processadas (ordem de prioridade)
-            frames_to_try = [
-                ('binary', denoised),       # Melhor para códigos 1D
-                ('sharpened', sharpened),   # Melhor para detalhes finos
-                ('enhanced', enhanced),     # Melhor para códigos 2D
-            ]
-            
-            best_result = None
-            best_confidence = 0
-            
-            for frame_type, processed in frames_to_try:
-                if PYZBAR_AVAILABLE:
-                    try:
-                        import os
-                        stderr_backup = sys.stderr
-                        sys.stderr = open(os.devnull, 'w')
-                        
-                        try:
-                            refined_objects = pyzbar.decode(processed)
-                        finally:
-                            sys.stderr.close()
-                            sys.stderr = stderr_backup
-                        
-                        for obj in refined_objects:
-                            try:
-                                refined_data = obj.data.decode('utf-8', errors='ignore')
-                                
-                                # Valida resultado
-                                if len(refined_data) < 3:
-                                    continue
-                                
-                                # ✅ CRITÉRIO DE CONFIANÇA: Prefere detecções com maior área
-                                confidence = obj.rect.width * obj.rect.height
-                                
-                                if confidence > best_confidence:
-                                    best_confidence = confidence
-                                    best_result = {
-                                        'type': obj.type,
-                                        'data': refined_data,
-                                        'bbox': region['bbox'],
-                                        'points': region['polygon'],
-                                        'detected_on': f'refined_{frame_type}',
-                                        # ✅ ARMAZENA TODAS AS VERSÕES PROCESSADAS
-                                        'rectified_original': rectified_original,  # Original retificada
-                                        'rectified_enhanced': enhanced,            # Com CLAHE
-                                        'rectified_gray': sharpened,               # Escala de cinza aguçada
-                                        'rectified_binary': denoised               # Binarizada
-                                    }
-                            except Exception:
-                                continue
-                    except Exception:
-                        pass
-            
-            # Se encontrou resultado refinado, adiciona
-            if best_result:
-                code_key = f"{best_result['type']}:{best_result['data']}"
-                if code_key not in processed_codes:
-                    processed_codes.add(code_key)
-                    codes.append(best_result)
-        
-        # ============ FALLBACK: Se não detectou nada, tenta no frame completo ============
-        if len(codes) == 0:
-            # Pipeline PDI no frame completo (como backup)
-            clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-            lab = cv2.cvtColor(frame, cv2.COLOR_BGR2LAB)
-            lab[:, :, 0] = clahe.apply(lab[:, :, 0])
-            enhanced_frame = cv2.cvtColor(lab, cv2.COLOR_LAB2BGR)
-            
-            gray = cv2.cvtColor(enhanced_frame, cv2.COLOR_BGR2GRAY)
-            
-            binary = cv2.adaptiveThreshold(
-                gray, 255,
-                cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                cv2.THRESH_BINARY,
-                blockSize=11,
-                C=2
-            )
-            
-            kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
-            denoised = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel, iterations=1)
-            
-            # Cache para miniaturas
-            self.enhanced_frame_cache = enhanced_frame
-            self.gray_frame_cache = gray
-            self.binary_frame_cache = denoised
-            
-            # Tenta detectar
-            frames_to_try = [
-                ('binary', denoised),
-                ('enhanced', enhanced_frame),
-                ('gray', gray)
-            ]
-            
-            detected_data = set()
-            
-            for frame_type, processed_frame in frames_to_try:
-                if PYZBAR_AVAILABLE:
-                    try:
-                        import os
-                        stderr_backup = sys.stderr
-                        sys.stderr = open(os.devnull, 'w')
-                        
-                        try:
-                            decoded_objects = pyzbar.decode(processed_frame)
-                        finally:
-                            sys.stderr.close()
-                            sys.stderr = stderr_backup
-                        
-                        for obj in decoded_objects:
-                            try:
-                                data_key = obj.data.decode('utf-8', errors='ignore')
-                                x, y, w, h = obj.rect
-                                
-                                if not self.is_valid_code(obj.type, data_key, (x, y, w, h)):
-                                    continue
-                                
-                                if data_key not in detected_data:
-                                    detected_data.add(data_key)
-                                    # Recorta região do código
-                                    code_roi = frame[y:y+h, x:x+w].copy()
-
-                                    codes.append({
-                                        'type': obj.type,
-                                        'data': data_key,
-                                        'bbox': (x, y, w, h),
-                                        'points': obj.polygon,
-                                        'detected_on': f'fullframe_{frame_type}',
-                                        # ✅ Adiciona versões processadas da região recortada
-                                        'rectified_original': code_roi,
-                                        'rectified_enhanced': enhanced_frame[y:y+h, x:x+w].copy(),
-                                        'rectified_gray': gray[y:y+h, x:x+w].copy(),
-                                        'rectified_binary': denoised[y:y+h, x:x+w].copy()
-                                    })
-                            except Exception:
-                                continue
-                    except Exception:
-                        pass
-        
-        return codes
+        """Detecta códigos 1D e 2D no frame (delegado ao DetectionEngine)"""
+        return self.engine.scan(frame)
 
     def apply_software_boost(self, frame: np.ndarray) -> np.ndarray:
         """Aplica boost de software (ganho digital)"""
@@ -536,121 +274,117 @@ class CameraThread(QThread):
         """Verifica se é uma detecção duplicada recente"""
         return code_data in self.recent_detections
     
+    def code_image(self, code: Dict) -> Optional[np.ndarray]:
+        """Imagem da miniatura de um código no modo selecionado
+
+        Só a versão do modo atual é calculada (code_variant), e só para
+        códigos que serão emitidos. Não aplica o boost: as versões já vêm do
+        frame com boost (run), aplicá-lo de novo dobraria o efeito.
+        """
+        variant = THUMBNAIL_VARIANTS.get(self.thumbnail_mode, 'enhanced')
+        code_image = code_variant(code, variant)
+        if code_image is None:
+            # Fallback: recorta do frame processado (código sem versões próprias)
+            x, y, w, h = code['bbox']
+            frame_cache = {
+                'binary': self.engine.binary_frame_cache,
+                'gray': self.engine.gray_frame_cache,
+            }.get(variant, self.engine.enhanced_frame_cache)
+            if frame_cache is None:
+                return None
+            code_image = frame_cache[y:y+h, x:x+w]
+        return code_image
+    
     def run(self):
-        """Loop principal da thread otimizado"""
+        """Estágio de DECODIFICAÇÃO: consome o frame mais recente da captura
+
+        Pipeline em 3 estágios:
+        [Captura: LatestFrameGrabber] → [Decodificação] → render_queue (2) → [Apresentação]
+        O grabber chama grab() na taxa do sensor e só decodifica (retrieve) o
+        frame mais recente quando este loop pede um; frames antigos nunca
+        acumulam no driver nem pagam o custo de decodificação MJPEG.
+        """
         self.running = True
-        params_update_counter = 0
         
-        # ✅ Aguarda 1 segundo para autofoco estabilizar
-        print("⏳ Aguardando autofoco estabilizar...")
-        self.msleep(1000)
+        # ✅ Aguarda 1 segundo para autofoco estabilizar (só câmeras)
+        warmup_ms = getattr(self.camera, 'warmup_ms', 1000)
+        if warmup_ms:
+            print("⏳ Aguardando autofoco estabilizar...")
+            self.msleep(warmup_ms)
         print("✅ Pronto para detecção!")
+        self.engine.reset_tracking()  # Trilhas de uma sessão anterior não valem
+        
+        self.render_queue = queue.Queue(maxsize=2)
+        params_update_counter = 0
+        
+        self.grabber = LatestFrameGrabber(self.camera)
+        self.grabber.start()
+        render_worker = threading.Thread(target=self.render_loop, name="apresentacao", daemon=True)
+        render_worker.start()
         
         while self.running:
-            if self.camera is None or not self.camera.isOpened():
-                self.msleep(100)
-                continue
-            
             # ✅ Aplica parâmetros a cada 15 frames (mais conservador)
+            # Executado na thread do grabber, única que acessa a câmera
             params_update_counter += 1
             if self.params_changed and params_update_counter >= 15:
-                self.apply_pdi_params()
+                self.grabber.call_soon(self.apply_pdi_params)
                 self.params_changed = False
                 params_update_counter = 0
             
-            ret, frame = self.camera.read()
-            if not ret:
-                continue
-            
-            # Frame skip para modo rápido
-            self.frame_count += 1
-            if self.frame_count % self.frame_skip != 0:
+            # Frame mais recente (modo rápido: pula frame_skip - 1 frames)
+            timer = self.stage_timer
+            start = time.perf_counter()
+            ok, frame, timestamp = self.grabber.read(timeout=0.1, min_new_frames=self.frame_skip)
+            if not ok:
                 continue
+            frame_start = time.perf_counter()
+            timer.add('read', (frame_start - start) * 1000.0)
+            self.decode_times.append(frame_start)
+            self.last_frame_timestamp = timestamp
+            self.frame_count = self.grabber.frames_grabbed
+            self.frames_dropped = self.grabber.frames_skipped
             
             # Aplica boost de software se habilitado
             self.params_mutex.lock()
             boost_enabled = self.pdi_params.get("boost", False)
             self.params_mutex.unlock()
             
+            # ✅ Filtro de movimento (no frame cru, antes do boost)
+            with timer.measure('motion'):
+                motion = self.motion_gate.check(frame)
+            
             if boost_enabled:
-                frame = self.apply_software_boost(frame)
+                with timer.measure('boost'):
+                    frame = self.apply_software_boost(frame)
             
-            # Detecta códigos
-            codes = self.detect_codes(frame)
-
-            # ✅ Escolhe a imagem baseado no modo selecionado
-            if self.thumbnail_mode == "Binarizada" and hasattr(self, 'binary_frame_cache'):
-                processed_frame = self.binary_frame_cache
-            elif self.thumbnail_mode == "Escala de Cinza" and hasattr(self, 'gray_frame_cache'):
-                processed_frame = self.gray_frame_cache
-            elif hasattr(self, 'enhanced_frame_cache'):
-                processed_frame = self.enhanced_frame_cache
+            # Detecta códigos (frame repetido ou cena parada → resultado anterior ainda vale)
+            if motion != 'changed':
+                codes = self.last_codes
             else:
-                processed_frame = frame
-
-            # Se boost está ativado, aplica (exceto em binarizada que já é P&B)
-            if boost_enabled and self.thumbnail_mode != "Binarizada":
-                processed_frame = self.apply_software_boost(processed_frame)
-                        
-            # Desenha retângulos e legendas
-            display_frame = frame.copy()
-            for code in codes:
-                x, y, w, h = code['bbox']
-                cv2.rectangle(display_frame, (x, y), (x + w, y + h), (0, 255, 0), 3)
-                
-                label = f"{code['type']}: {code['data']}"
-                cv2.putText(display_frame, label, (x, y - 10),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
-                
-                # ✅ PRIORIZA imagem retificada ESPECÍFICA do código
-                if 'rectified_binary' in code:
-                    # Tem versões retificadas disponíveis
-                    if self.thumbnail_mode == "Binarizada":
-                        code_image = code.get('rectified_binary', code.get('rectified_original')).copy()
-                    elif self.thumbnail_mode == "Escala de Cinza":
-                        code_image = code.get('rectified_gray', code.get('rectified_original')).copy()
-                    else:  # Enhanced (CLAHE)
-                        code_image = code.get('rectified_enhanced', code.get('rectified_original')).copy()
-                    
-                    # Aplica boost se ativo (exceto em binarizada)
-                    if boost_enabled and self.thumbnail_mode != "Binarizada":
-                        code_image = self.apply_software_boost(code_image)
-                        
-                elif 'rectified_image' in code:
-                    # Fallback: usa rectified_image antiga (compatibilidade)
-                    code_image = code['rectified_image'].copy()
-                    
-                    if boost_enabled:
-                        code_image = self.apply_software_boost(code_image)
-                    
-                    # Aplica boost se ativo (exceto em binarizada)
-                    if boost_enabled and self.thumbnail_mode != "Binarizada":
-                        code_image = self.apply_software_boost(code_image)
-                else:
-                    # Fallback: recorta do frame processado (método antigo)
-                    x, y, w, h = code['bbox']
-                    if self.thumbnail_mode == "Binarizada" and hasattr(self, 'binary_frame_cache'):
-                        code_image = self.binary_frame_cache[y:y+h, x:x+w].copy()
-                    elif self.thumbnail_mode == "Escala de Cinza" and hasattr(self, 'gray_frame_cache'):
-                        code_image = self.gray_frame_cache[y:y+h, x:x+w].copy()
-                    elif hasattr(self, 'enhanced_frame_cache'):
-                        code_image = self.enhanced_frame_cache[y:y+h, x:x+w].copy()
-                    else:
-                        code_image = processed_frame[y:y+h, x:x+w].copy()
-                    
-                    # Aplica boost se ativo
-                    if boost_enabled and self.thumbnail_mode != "Binarizada":
-                        code_image = self.apply_software_boost(code_image)
+                start = time.perf_counter()
+                codes = self.detect_codes(frame)
+                detect_ms = (time.perf_counter() - start) * 1000.0
+                timer.add('detect', detect_ms)
+                if self.metrics is not None:
+                    self.metrics.observe('codedetect_decode_latency_seconds', detect_ms / 1000.0)
+                self.last_codes = codes
+            if self.metrics is not None:
+                self.metrics.inc('codedetect_frames_processed_total', motion=motion)
 
+            start = time.perf_counter()
+            for code in codes:
                 # Emite sinal de código detectado (evita duplicatas)
                 code_key = f"{code['type']}:{code['data']}"
                 if not self.is_duplicate_detection(code_key):
                     self.recent_detections.append(code_key)
+                    if self.metrics is not None:
+                        self.metrics.inc('codedetect_codes_total', symbology=code['type'])
                     
                     self.code_detected.emit({
                         'type': code['type'],
                         'data': code['data'],
-                        'image': code_image,  # ✅ Agora usa imagem retificada + PDI
+                        # ✅ Imagem retificada + PDI, já reduzida para a miniatura (QImage)
+                        'thumbnail': make_thumbnail(self.code_image(code)),
                         'bbox': code['bbox'],
                         'timestamp': datetime.now().strftime("%H:%M:%S.%f")[:-3]
                     })
@@ -658,35 +392,444 @@ class CameraThread(QThread):
                     # Adiciona ao set de códigos detectados (inspeção)
                     if self.inspecting:
                         self.detected_codes.add(code['data'])
+            timer.add('thumbnails', (time.perf_counter() - start) * 1000.0)
             
             # Lógica de inspeção
+            inspection_info = None
             if self.inspecting:
                 elapsed = (datetime.now() - self.inspection_start_time).total_seconds()
                 detected_count = len(self.detected_codes)
-                
-                # Adiciona informações na tela
-                cv2.putText(display_frame, f"Detectados: {detected_count}/{self.expected_codes}",
-                           (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (106, 90, 205), 2)
-                cv2.putText(display_frame, f"Tempo: {elapsed:.1f}s / {self.timeout}s",
-                           (10, 70), cv2.FONT_HERSHEY_SIMPLEX, 1, (106, 90, 205), 2)
+                inspection_info = (detected_count, self.expected_codes, elapsed, self.timeout)
                 
                 # Aguarda timeout completo
                 if elapsed >= self.timeout:
                     success = (detected_count == self.expected_codes)
                     self.inspection_complete.emit(success, detected_count)
                     self.inspecting = False
+                    if self.metrics is not None:
+                        self.metrics.inc('codedetect_inspections_total', result='ok' if success else 'ng')
+                        self.metrics.observe('codedetect_inspection_cycle_seconds', elapsed)
+            
+            # Envia para o estágio de apresentação (sem bloquear a decodificação)
+            # (frame repetido da câmera não gera novo preview)
+            if motion == 'duplicate':
+                timer.add('frame', (time.perf_counter() - frame_start) * 1000.0)
+                continue
+            overlays = [(code['bbox'], f"{code['type']}: {code['data']}") for code in codes]
+            if put_latest(self.render_queue, (frame, overlays, inspection_info)):
+                self.previews_dropped += 1
+            timer.add('frame', (time.perf_counter() - frame_start) * 1000.0)
+        
+        self.grabber.stop()
+        render_worker.join(timeout=1.0)
+        grabber, self.grabber = self.grabber, None
+        self._grabbed_before += grabber.frames_grabbed
+        self._skipped_before += grabber.frames_skipped
+    
+    def render_loop(self):
+        """Estágio de APRESENTAÇÃO: reduz o frame ao tamanho do preview e o publica
+
+        ✅ A GUI recebe uma imagem já no tamanho do QLabel (INTER_AREA) e
+        desenha os overlays com QPainter; nada é desenhado no frame completo.
+        """
+        while self.running:
+            try:
+                frame, overlays, inspection_info = self.render_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
             
-            # Emite frame processado
-            self.frame_ready.emit(display_frame)
-            
-            self.msleep(16)  # ~60 FPS máximo (mais suave)
+            start = time.perf_counter()
+            height, width = frame.shape[:2]
+            max_width, max_height = self.preview_size
+            scale = min(max_width / width, max_height / height, 1.0)
+            if scale < 1.0:
+                size = (max(1, round(width * scale)), max(1, round(height * scale)))
+                preview = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+            else:
+                preview = frame
+            
+            # Retângulos e legendas nas coordenadas do preview
+            boxes = [((round(x * scale), round(y * scale), round(w * scale), round(h * scale)), label)
+                     for (x, y, w, h), label in overlays]
+            overlay = {
+                'boxes': boxes,
+                'inspection': inspection_info,
+                'stats': self.stats_lines() if self.show_stats else None,
+            }
+            self.stage_timer.add('preview', (time.perf_counter() - start) * 1000.0)
+            
+            # Deixa no mailbox (substitui o anterior se a GUI ainda não o buscou)
+            self.preview_mailbox.post((preview, overlay))
+    
+    def stats_lines(self) -> List[str]:
+        """Texto do overlay: FPS e tempo médio / p95 de cada etapa
+
+        Os percentis só são recalculados a cada STATS_OVERLAY_REFRESH_S,
+        então o custo por frame fica no desenho do texto.
+        """
+        now = time.perf_counter()
+        if now - self._stats_updated < STATS_OVERLAY_REFRESH_S:
+            return self._stats_lines
+        self._stats_updated = now
+        
+        def rate(times: deque) -> float:
+            times = list(times)
+            if len(times) < 2 or times[-1] <= times[0]:
+                return 0.0
+            return (len(times) - 1) / (times[-1] - times[0])
+        
+        stages = {**self.engine.stage_summary(), **self.stage_timer.summary()}
+        lines = [f"FPS decod {rate(self.decode_times):.1f} | video {rate(self.render_times):.1f}"]
+        if 'frame' in stages:
+            lines.append(f"frame {stages['frame']['mean_ms']:.1f} ms (p95 {stages['frame']['p95_ms']:.1f})")
+        for stage in STATS_OVERLAY_STAGES:
+            if stage in stages:
+                lines.append(f"{stage} {stages[stage]['mean_ms']:.1f} ms (p95 {stages[stage]['p95_ms']:.1f})")
+        self._stats_lines = lines
+        return lines
+    
+    def enable_metrics(self, registry: MetricsRegistry):
+        """Declara as métricas da estação e passa a alimentá-las
+
+        Contadores de eventos (códigos, inspeções, latência) são atualizados
+        pela thread de decodificação; os demais valores são lidos em
+        collect_metrics() somente quando o servidor é consultado.
+        """
+        registry.describe('codedetect_frames_captured_total', 'counter', "Frames capturados da fonte (grab)")
+        registry.describe('codedetect_frames_dropped_total', 'counter', "Frames capturados e nunca decodificados")
+        registry.describe('codedetect_previews_dropped_total', 'counter', "Previews descartados antes da apresentação (fila de apresentação / mailbox da GUI)")
+        registry.describe('codedetect_frames_processed_total', 'counter',
+                          "Frames processados por resultado do filtro de movimento (changed = detecção executada)")
+        registry.describe('codedetect_decode_latency_seconds', 'histogram', "Latência da detecção por frame")
+        registry.describe('codedetect_codes_total', 'counter', "Códigos emitidos (sem repetições) por simbologia")
+        registry.describe('codedetect_inspections_total', 'counter', "Inspeções concluídas por resultado (ok/ng)")
+        registry.describe('codedetect_inspection_cycle_seconds', 'histogram', "Duração do ciclo de inspeção",
+                          buckets=CYCLE_BUCKETS_S)
+        registry.describe('codedetect_camera_reconnects_total', 'counter', "Fontes de frames reabertas")
+        registry.describe('codedetect_fallback_runs_total', 'counter', "Fallbacks no frame completo executados")
+        registry.describe('codedetect_queue_depth', 'gauge', "Itens aguardando em cada fila do pipeline")
+        registry.describe('codedetect_running', 'gauge', "1 se o pipeline de captura está ativo")
+        registry.add_collector(self.collect_metrics)
+        self.metrics = registry
+    
+    def collect_metrics(self):
+        """Valores lidos no momento da coleta (thread do servidor de métricas)"""
+        grabber = self.grabber
+        grabbed = self._grabbed_before + (grabber.frames_grabbed if grabber is not None else 0)
+        skipped = self._skipped_before + (grabber.frames_skipped if grabber is not None else 0)
+        yield 'codedetect_frames_captured_total', {}, grabbed
+        yield 'codedetect_frames_dropped_total', {}, skipped
+        yield 'codedetect_previews_dropped_total', {'stage': 'queue'}, self.previews_dropped
+        yield 'codedetect_previews_dropped_total', {'stage': 'mailbox'}, self.preview_mailbox.dropped
+        yield 'codedetect_camera_reconnects_total', {}, self.camera_reconnects
+        yield 'codedetect_fallback_runs_total', {}, self.engine.fallback_runs
+        yield 'codedetect_queue_depth', {'queue': 'render'}, self.render_queue.qsize()
+        yield 'codedetect_running', {}, int(self.running)
+    
+    def export_stage_times(self) -> Dict:
+        """Resumo e histograma das janelas recentes (pipeline e motor)"""
+        return {
+            'exported_at': datetime.now().isoformat(timespec='seconds'),
+            'source': getattr(self.camera, 'description', None),
+            'pipeline': self.stage_timer.export(),
+            'engine': self.engine.stage_timer.export(),
+        }
     
     def stop(self):
-        """Para a thread"""
+        """Para a thread (e os estágios de captura/apresentação)"""
         self.running = False
+        self.wait()
+        self.engine.close()
+        self.preview_mailbox.clear()  # Preview velho não sobrescreve "Câmera fechada"
+        
+        # Latência média por chamada de cada decodificador
+        for name, stats in self.engine.latency_summary().items():
+            print(f"⏱️ {name}: {stats['mean_ms']:.1f} ms/chamada (máx {stats['max_ms']:.1f} ms, n={stats['calls']})")
+        pipeline = self.stage_timer.summary()
+        if pipeline:
+            stages = ", ".join(f"{stage} {stats['mean_ms']:.1f}" for stage, stats in pipeline.items())
+            print(f"⏱️ Etapas do pipeline (ms/frame): {stages}")
+        print(f"🖼️ Previews descartados: {self.previews_dropped} na fila de apresentação, "
+              f"{self.preview_mailbox.dropped} substituídos antes de a tela buscar")
+        print(f"💤 Filtro de movimento: {self.motion_gate.static_skips} frames parados, "
+              f"{self.motion_gate.duplicates} repetidos (sem detecção)")
+        print(f"🔁 Fallback no frame completo: {self.engine.fallback_runs} executados, "
+              f"{self.engine.fallback_skipped} evitados")
+        deadline = self.engine.deadline_stats()
+        if deadline.get('frames'):
+            cuts = ", ".join(f"{stage}={count}" for stage, count in sorted(deadline['cuts'].items())) or "nenhum"
+            forced = ", ".join(f"{stage}={count}" for stage, count in sorted(deadline['forced'].items())) or "nenhuma"
+            print(f"⏳ Prazo por frame: cumprido em {deadline['deadline_hit_rate']:.0%} de {deadline['frames']} frames; "
+                  f"cortes: {cuts}; execuções forçadas: {forced}")
+        cache = self.engine.cache_stats()
+        if cache:
+            print(f"🗃️ Cache de regiões: {cache['hits']} acertos / {cache['misses']} falhas "
+                  f"({cache['hit_rate']:.0%}), {cache['entries']} entradas, {cache['bytes'] / 1e6:.1f} MB")
         if self.camera is not None:
             self.camera.release()
-        self.wait()
+            self.camera = None
+
+
+# ==================== UTILITÁRIOS DE PIPELINE ====================
+def put_latest(q: queue.Queue, item) -> bool:
+    """Insere item em fila limitada descartando o mais antigo se cheia
+
+    Retorna True se algum item foi descartado.
+    """
+    dropped = False
+    while True:
+        try:
+            q.put_nowait(item)
+            return dropped
+        except queue.Full:
+            try:
+                q.get_nowait()
+                dropped = True
+            except queue.Empty:
+                pass
+
+
+def make_thumbnail(image: np.ndarray) -> Optional[QImage]:
+    """Miniatura no tamanho THUMBNAIL_SIZE (mantém a proporção), pronta para a GUI
+
+    Feita na thread de decodificação: QImage (diferente de QPixmap) pode ser
+    criada fora da thread da GUI. A cópia final desvincula a QImage do array.
+    """
+    if image is None or image.size == 0:
+        return None
+    h, w = image.shape[:2]
+    scale = min(THUMBNAIL_SIZE[0] / w, THUMBNAIL_SIZE[1] / h)
+    size = (max(1, round(w * scale)), max(1, round(h * scale)))
+    interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+    thumb = np.ascontiguousarray(cv2.resize(image, size, interpolation=interpolation))
+    
+    if thumb.ndim == 2:
+        # Escala de cinza ou binarizada: sem conversão de cor
+        qt_image = QImage(thumb.data, size[0], size[1], thumb.strides[0], QImage.Format_Grayscale8)
+    elif QIMAGE_FORMAT_BGR888 is not None:
+        qt_image = QImage(thumb.data, size[0], size[1], thumb.strides[0], QIMAGE_FORMAT_BGR888)
+    else:
+        thumb = cv2.cvtColor(thumb, cv2.COLOR_BGR2RGB)
+        qt_image = QImage(thumb.data, size[0], size[1], thumb.strides[0], QImage.Format_RGB888)
+    return qt_image.copy()
+
+
+class PreviewMailbox:
+    """Caixa de uma posição para o preview mais recente ("latest wins")
+
+    O produtor substitui o conteúdo a cada post(); o consumidor leva o que
+    houver com take(). A memória fica limitada a um preview, seja qual for
+    a diferença de ritmo entre os dois lados.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._item = None
+        self.posted = 0      # Previews publicados
+        self.dropped = 0     # Substituídos antes de serem buscados
+
+    def post(self, item):
+        with self._lock:
+            if self._item is not None:
+                self.dropped += 1
+            self._item = item
+            self.posted += 1
+
+    def take(self):
+        """Retorna o preview pendente (ou None) e esvazia a caixa"""
+        with self._lock:
+            item, self._item = self._item, None
+            return item
+
+    def clear(self):
+        with self._lock:
+            self._item = None
+
+
+# ==================== HISTÓRICO DE DETECÇÕES ====================
+class HistoryModel(QAbstractListModel):
+    """Modelo da lista de histórico: uma janela deslizante sobre o HistoryStore
+
+    Todas as entradas ficam em disco. A lista só enxerga as linhas
+    [first_row, last_row) (as views do Qt refazem o layout de todas as linhas
+    a cada inserção, então o número de linhas precisa ser limitado):
+      • seguindo o fim, trim() mantém as HISTORY_WINDOW_ROWS mais recentes
+      • rolando até o topo, fetch_older() insere a página anterior (do disco)
+      • rolada para cima, a janela para de crescer em HISTORY_MAX_ROWS: as
+        detecções seguintes só vão para o disco e fetch_newer() as insere
+        quando a lista volta ao fim
+    Novas detecções aguardam em `pending` até flush(), chamado por um QTimer:
+    um único beginInsertRows por lote em vez de um item por detecção.
+    """
+
+    def __init__(self, store: HistoryStore, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.pending: List[Dict] = []
+        self.first_row = 0          # Entrada do histórico exibida na linha 0
+        self.last_row = 0           # Primeira entrada depois da última linha
+        self._recent = deque(maxlen=HISTORY_WINDOW_ROWS)
+        self._pages: "OrderedDict[int, List[Dict]]" = OrderedDict()
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else self.last_row - self.first_row
+
+    @property
+    def at_end(self) -> bool:
+        """True se a última linha da lista é a detecção mais recente"""
+        return self.last_row == len(self.store)
+
+    def data(self, index: QModelIndex, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        entry = self.entry(self.first_row + index.row())
+        if entry is None:
+            return None
+        # Uma linha por entrada (setUniformItemSizes): quebras viram espaço
+        data = str(entry['data']).replace('\r', ' ').replace('\n', ' ')
+        return f"[{entry['timestamp']}] {entry['type']}: {data}"
+
+    def entry(self, position: int) -> Optional[Dict]:
+        """Entrada `position` do histórico (memória recente, página em cache ou disco)"""
+        first_recent = len(self.store) - len(self._recent)
+        if position >= first_recent:
+            return self._recent[position - first_recent]
+        page_index = position // HISTORY_PAGE_ROWS
+        page = self._pages.get(page_index)
+        if page is None:
+            page = self.store.read(page_index * HISTORY_PAGE_ROWS, HISTORY_PAGE_ROWS)
+            self._pages[page_index] = page
+            if len(self._pages) > HISTORY_PAGE_CACHE:
+                self._pages.popitem(last=False)
+        else:
+            self._pages.move_to_end(page_index)
+        offset = position - page_index * HISTORY_PAGE_ROWS
+        return page[offset] if offset < len(page) else None
+
+    def append(self, entry: Dict):
+        """Enfileira uma detecção (aparece na lista no próximo flush)"""
+        self.pending.append(entry)
+
+    def flush(self, max_rows: Optional[int] = None) -> int:
+        """Grava as detecções pendentes e insere na lista; retorna quantas entraram
+
+        Com `max_rows`, a lista não passa desse número de linhas: o excedente
+        fica só em disco (ver fetch_newer). Se a lista já não chegava ao fim,
+        nada é inserido.
+        """
+        if not self.pending:
+            return 0
+        batch, self.pending = self.pending, []
+        was_at_end = self.at_end
+        self.store.append_many(batch)
+        self._recent.extend(batch)
+        # Página parcial em cache ficaria desatualizada
+        self._pages.pop((len(self.store) - len(batch)) // HISTORY_PAGE_ROWS, None)
+
+        count = len(batch) if was_at_end else 0
+        if max_rows is not None:
+            count = min(count, max(0, max_rows - self.rowCount()))
+        self._insert_bottom(count)
+        return count
+
+    def _insert_bottom(self, count: int):
+        if count <= 0:
+            return
+        first = self.rowCount()
+        self.beginInsertRows(QModelIndex(), first, first + count - 1)
+        self.last_row += count
+        self.endInsertRows()
+
+    def trim(self, max_rows: int = HISTORY_WINDOW_ROWS) -> int:
+        """Tira do topo da lista as linhas além de `max_rows` (continuam em disco)"""
+        excess = self.rowCount() - max_rows
+        if excess <= 0:
+            return 0
+        self.beginRemoveRows(QModelIndex(), 0, excess - 1)
+        self.first_row += excess
+        self.endRemoveRows()
+        return excess
+
+    def trim_bottom(self, max_rows: int = HISTORY_MAX_ROWS) -> int:
+        """Tira do fim da lista as linhas além de `max_rows` (voltam com fetch_newer)"""
+        excess = self.rowCount() - max_rows
+        if excess <= 0:
+            return 0
+        first = self.rowCount() - excess
+        self.beginRemoveRows(QModelIndex(), first, first + excess - 1)
+        self.last_row -= excess
+        self.endRemoveRows()
+        return excess
+
+    def fetch_newer(self) -> int:
+        """Insere no fim a página seguinte à janela; retorna quantas linhas"""
+        count = min(HISTORY_PAGE_ROWS, len(self.store) - self.last_row)
+        self._insert_bottom(count)
+        return count
+
+    def fetch_older(self) -> int:
+        """Insere no topo a página anterior à janela; retorna quantas linhas"""
+        count = min(HISTORY_PAGE_ROWS, self.first_row)
+        if count <= 0:
+            return 0
+        self.beginInsertRows(QModelIndex(), 0, count - 1)
+        self.first_row -= count
+        self.endInsertRows()
+        return count
+
+
+# ==================== MINIATURAS ====================
+class ThumbnailTile(QWidget):
+    """Bloco de miniatura (imagem + tipo/conteúdo) reutilizado entre inspeções
+
+    Criado uma vez; show_code() só troca o pixmap e o texto.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # ✅ TAMANHO REDUZIDO: 120x100 (era 150x130)
+        self.setFixedSize(140, 140)  # Container compacto
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(3, 3, 3, 3)
+        layout.setSpacing(3)
+        
+        self.img_label = QLabel()
+        self.img_label.setFixedSize(*THUMBNAIL_SIZE)
+        self.img_label.setAlignment(Qt.AlignCenter)
+        # ✅ BORDA VERDE + FUNDO BRANCO (mais fina)
+        self.img_label.setStyleSheet("""
+            border: 2px solid #4CAF50;
+            background-color: white;
+            padding: 1px;
+        """)
+        layout.addWidget(self.img_label)
+        
+        self.text_label = QLabel()
+        self.text_label.setAlignment(Qt.AlignCenter)
+        self.text_label.setWordWrap(True)
+        self.text_label.setFixedHeight(30)  # Reduzido de 50 para 30
+        self.text_label.setStyleSheet("""
+            font-size: 8px;
+            color: #333;
+            font-weight: bold;
+            background-color: #f0f0f0;
+            border: 1px solid #ccc;
+            border-radius: 3px;
+            padding: 2px;
+        """)
+        layout.addWidget(self.text_label)
+        self.hide()
+
+    def show_code(self, thumbnail: QImage, code_type: str, code_value: str):
+        self.img_label.setPixmap(QPixmap.fromImage(thumbnail))
+        # Trunca texto longo
+        display_text = code_value if len(code_value) <= 15 else code_value[:12] + "..."
+        self.text_label.setText(f"{code_type}\n{display_text}")
+        self.show()
+
+    def clear(self):
+        self.hide()
+        self.img_label.clear()
 
 
 # ==================== INTERFACE PRINCIPAL ====================
@@ -701,17 +844,72 @@ class MainWindow(QMainWindow):
 
         # Thread de câmera
         self.camera_thread = CameraThread()
-        self.camera_thread.frame_ready.connect(self.update_frame)
         self.camera_thread.code_detected.connect(self.on_code_detected)
         self.camera_thread.inspection_complete.connect(self.on_inspection_complete)
         
-        # Histórico de códigos detectados
-        self.detected_history = []
+        # Histórico de códigos detectados (modelo com janela em memória + disco)
+        self.history_model = HistoryModel(HistoryStore(), self)
         self.current_thumbnails = []
         
+        # Modelo (modeloN.json) ativo: recebe as estatísticas de PDI ao fechar
+        self.current_recipe: Optional[Path] = None
+        
+        # Servidor de métricas (opcional, --metrics-port)
+        self.metrics_server: Optional[MetricsServer] = None
+        
         # Setup UI
         self.setup_ui()
         self.list_cameras()
+        
+        # ✅ Histórico inserido em lote
+        self.history_timer = QTimer(self)
+        self.history_timer.timeout.connect(self.flush_history)
+        self.history_timer.start(HISTORY_FLUSH_MS)
+        
+        # ✅ Busca o preview no mailbox da thread (taxa de tela independente da decodificação)
+        self.preview_timer = QTimer(self)
+        self.preview_timer.timeout.connect(self.pull_preview)
+        self.set_preview_rate(PREVIEW_REFRESH_HZ)
+    
+    def set_preview_rate(self, hz: float):
+        """Define quantas vezes por segundo a tela busca um novo preview"""
+        hz = max(1.0, float(hz))
+        self.preview_timer.start(max(1, round(1000 / hz)))
+        print(f"🖼️ Atualização do vídeo: {hz:g} Hz")
+    
+    def flush_history(self):
+        """Insere as detecções pendentes; acompanha o fim só se a lista já estava nele"""
+        scrollbar = self.history_list.verticalScrollBar()
+        if scrollbar.value() >= scrollbar.maximum() and self.history_model.at_end:
+            if self.history_model.flush():
+                self.history_model.trim()
+                self.history_list.scrollToBottom()
+        else:
+            # Rolada para cima: a lista não cresce além do limite (o resto fica em disco)
+            self.history_model.flush(HISTORY_MAX_ROWS)
+    
+    def on_history_scrolled(self, value: int):
+        """Nas pontas da lista, traz a página vizinha do disco mantendo a posição"""
+        scrollbar = self.history_list.verticalScrollBar()
+        top = self.history_list.indexAt(self.history_list.viewport().rect().topLeft())
+        row = top.row() if top.isValid() else 0
+        if value <= scrollbar.minimum():
+            added = self.history_model.fetch_older()
+            if added:
+                # Linhas de baixo saem (longe da área visível) para manter o limite
+                self.history_model.trim_bottom()
+                self.history_list.scrollTo(self.history_model.index(row + added), QListView.PositionAtTop)
+        elif value >= scrollbar.maximum() and not self.history_model.at_end:
+            if self.history_model.fetch_newer():
+                removed = self.history_model.trim(HISTORY_MAX_ROWS)
+                if removed:
+                    self.history_list.scrollTo(self.history_model.index(row - removed), QListView.PositionAtTop)
+    
+    def pull_preview(self):
+        """Exibe o preview mais recente, se houver um novo"""
+        item = self.camera_thread.preview_mailbox.take()
+        if item is not None:
+            self.update_frame(*item)
 
     def update_thumbnail_mode(self, mode: str):
         """Atualiza o modo de miniatura na thread"""
@@ -729,6 +927,9 @@ class MainWindow(QMainWindow):
         
         # Menu Arquivo
         file_menu = menubar.addMenu("📁 Arquivo")
+        export_times_action = file_menu.addAction("📊 Exportar Tempos por Etapa...")
+        export_times_action.setShortcut("Ctrl+E")
+        export_times_action.triggered.connect(self.export_stage_times)
         exit_action = file_menu.addAction("❌ Sair")
         exit_action.setShortcut("Ctrl+Q")
         exit_action.triggered.connect(self.close)
@@ -745,6 +946,11 @@ class MainWindow(QMainWindow):
         minimize_action.setShortcut("Ctrl+M")
         minimize_action.triggered.connect(self.showMinimized)
         
+        stats_action = view_menu.addAction("📈 Desempenho no Vídeo (FPS e etapas)")
+        stats_action.setShortcut("F3")
+        stats_action.setCheckable(True)
+        stats_action.toggled.connect(self.toggle_stats_overlay)
+        
         # Menu Ajuda
         help_menu = menubar.addMenu("❓ Ajuda")
         about_action = help_menu.addAction("ℹ️ Sobre")
@@ -763,7 +969,7 @@ class MainWindow(QMainWindow):
         camera_layout = QVBoxLayout()
         
         self.camera_combo = QComboBox()
-        camera_layout.addWidget(QLabel("Selecionar Câmera:"))
+        camera_layout.addWidget(QLabel("Selecionar Câmera / Fonte:"))
         camera_layout.addWidget(self.camera_combo)
         
         btn_layout = QHBoxLayout()
@@ -812,17 +1018,30 @@ class MainWindow(QMainWindow):
         self.combo_thumbnail_mode.currentTextChanged.connect(self.update_thumbnail_mode)
         inspection_layout.addWidget(self.combo_thumbnail_mode, 3, 1)
         
+        # Simbologias habilitadas no zbar (salvas no modelo)
+        inspection_layout.addWidget(QLabel("Simbologias:"), 4, 0)
+        self.txt_symbologies = QLineEdit()
+        self.txt_symbologies.setPlaceholderText("Todas (ex: QRCODE, CODE128)")
+        self.txt_symbologies.setToolTip("Restringe o zbar às simbologias listadas: mais rápido e sem falsos DataBar")
+        self.txt_symbologies.editingFinished.connect(self.update_symbologies)
+        inspection_layout.addWidget(self.txt_symbologies, 4, 1)
+        
+        self.check_pyramid = QCheckBox("Pirâmide (decodifica em 1/2 resolução primeiro)")
+        self.check_pyramid.setToolTip("Códigos grandes/próximos decodificam mais rápido; volta à resolução total se falhar")
+        inspection_layout.addWidget(self.check_pyramid, 5, 0, 1, 2)
+        self.check_pyramid.toggled.connect(self.toggle_pyramid)
+        
         self.btn_start_inspection = QPushButton("▶️ Iniciar Inspeção")
         self.btn_start_inspection.clicked.connect(self.start_inspection)
         self.btn_start_inspection.setStyleSheet("font-weight: bold; padding: 10px; background-color: #4CAF50; color: white;")
         self.btn_start_inspection.setEnabled(False)
-        inspection_layout.addWidget(self.btn_start_inspection, 4, 0, 1, 2)
+        inspection_layout.addWidget(self.btn_start_inspection, 6, 0, 1, 2)
         
         self.btn_stop_inspection = QPushButton("⏹️ Finalizar Inspeção")
         self.btn_stop_inspection.clicked.connect(self.stop_inspection)
         self.btn_stop_inspection.setStyleSheet("font-weight: bold; padding: 10px; background-color: #f44336; color: white;")
         self.btn_stop_inspection.setEnabled(False)
-        inspection_layout.addWidget(self.btn_stop_inspection, 5, 0, 1, 2)
+        inspection_layout.addWidget(self.btn_stop_inspection, 7, 0, 1, 2)
         
         inspection_group.setLayout(inspection_layout)
         left_layout.addWidget(inspection_group)
@@ -951,7 +1170,10 @@ class MainWindow(QMainWindow):
         right_layout.addWidget(history_label)
 
         # ✅ HISTÓRICO MAIS COMPACTO
-        self.history_list = QListWidget()
+        self.history_list = QListView()
+        self.history_list.setModel(self.history_model)
+        self.history_list.setUniformItemSizes(True)  # ✅ Sem medir cada linha (turnos longos)
+        self.history_list.verticalScrollBar().valueChanged.connect(self.on_history_scrolled)
         self.history_list.setMaximumHeight(120)  # Reduzido de 200 para 120
         self.history_list.setStyleSheet("font-size: 9px;")
         right_layout.addWidget(self.history_list)
@@ -974,6 +1196,13 @@ class MainWindow(QMainWindow):
         self.thumbnails_layout.setSpacing(5)  # Espaçamento reduzido
         self.thumbnails_layout.setContentsMargins(5, 5, 5, 5)
         self.thumbnails_layout.setAlignment(Qt.AlignTop)  # ✅ Alinha no topo
+        
+        # ✅ Blocos criados uma vez e reaproveitados (2 colunas)
+        self.thumbnail_tiles = []
+        for index in range(THUMBNAIL_POOL_SIZE):
+            tile = ThumbnailTile(self.thumbnails_container)
+            self.thumbnails_layout.addWidget(tile, index // 2, index % 2)
+            self.thumbnail_tiles.append(tile)
 
         thumbnails_scroll.setWidget(self.thumbnails_container)
         right_layout.addWidget(thumbnails_scroll)
@@ -1045,13 +1274,15 @@ class MainWindow(QMainWindow):
         
         if len(found_cameras) == 0:
             print("  ⚠️ Nenhuma câmera detectada!")
-            self.camera_combo.addItem("Nenhuma câmera detectada", -1)
-            self.camera_combo.setEnabled(False)
-            self.btn_open.setEnabled(False)
         else:
             print(f"  📹 Total: {len(found_cameras)} câmera(s) disponível(is)")
-            self.camera_combo.setEnabled(True)
-            self.btn_open.setEnabled(True)
+        
+        # ✅ Fontes sem hardware: vídeo gravado, pasta de imagens, gerador sintético
+        self.camera_combo.addItem("🎞️ Arquivo de vídeo...", "video")
+        self.camera_combo.addItem("🖼️ Pasta de imagens...", "folder")
+        self.camera_combo.addItem("🧪 Sintético (QR em movimento)", "synthetic")
+        self.camera_combo.setEnabled(True)
+        self.btn_open.setEnabled(True)
     
     def open_camera(self):
         """Abre a câmera selecionada"""
@@ -1059,15 +1290,36 @@ class MainWindow(QMainWindow):
             print("❌ Nenhuma câmera disponível!")
             return
         
-        index = self.camera_combo.currentData()
+        selection = self.camera_combo.currentData()
         
-        if index == -1:
-            print("❌ Câmera inválida selecionada!")
-            return
+        if isinstance(selection, int):
+            print(f"📹 Abrindo Câmera {selection}...")
+            self.camera_thread.camera_index = selection
+            source = CameraSource(selection)
+        elif selection == "video":
+            path, _ = QFileDialog.getOpenFileName(self, "Selecionar vídeo", "",
+                                                  "Vídeos (*.mp4 *.avi *.mkv *.mov *.m4v *.webm *.mjpeg *.mjpg)")
+            if not path:
+                return
+            source = VideoFileSource(path, realtime=True, loop=True)
+        elif selection == "folder":
+            path = QFileDialog.getExistingDirectory(self, "Selecionar pasta de imagens")
+            if not path:
+                return
+            source = ImageFolderSource(path, loop=True)
+        elif selection == "synthetic":
+            source = SyntheticSource()
+        else:
+            # Especificação vinda da linha de comando (--source)
+            try:
+                source = open_source(selection, realtime=True, loop=True)
+            except ValueError as e:
+                print(f"❌ {e}")
+                return
         
-        print(f"📹 Abrindo Câmera {index}...")
+        print(f"📹 Abrindo {source.description}...")
         
-        if self.camera_thread.set_camera(index):
+        if self.camera_thread.set_source(source):
             self.camera_thread.start()
             self.lbl_status.setText("AGUARDANDO")
             self.lbl_status.setStyleSheet("background-color: gray; color: white; padding: 20px; border-radius: 10px;")
@@ -1080,10 +1332,16 @@ class MainWindow(QMainWindow):
             
             print("✅ Câmera aberta com sucesso!")
         else:
-            print(f"❌ Falha ao abrir Câmera {index}")
+            print(f"❌ Falha ao abrir {source.description}")
             self.lbl_status.setText("ERRO AO ABRIR")
             self.lbl_status.setStyleSheet("background-color: red; color: white; padding: 20px; border-radius: 10px;")
     
+    def open_source_spec(self, spec: str):
+        """Seleciona e abre uma fonte pela especificação (ex: --source video:linha3.mp4)"""
+        self.camera_combo.insertItem(0, f"▶️ {spec}", spec)
+        self.camera_combo.setCurrentIndex(0)
+        self.open_camera()
+    
     def close_camera(self):
         """Fecha a câmera"""
         print("⏹️ Fechando câmera...")
@@ -1109,16 +1367,58 @@ class MainWindow(QMainWindow):
         
         print("✅ Câmera fechada com sucesso!")
     
-    def update_frame(self, frame: np.ndarray):
-        """Atualiza o frame de vídeo na interface"""
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        h, w, ch = rgb_frame.shape
-        bytes_per_line = ch * w
-        qt_image = QImage(rgb_frame.data, w, h, bytes_per_line, QImage.Format_RGB888)
-        pixmap = QPixmap.fromImage(qt_image)
-        
-        scaled_pixmap = pixmap.scaled(640, 480, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        self.video_label.setPixmap(scaled_pixmap)
+    def update_frame(self, frame: np.ndarray, overlay: dict):
+        """Atualiza o frame de vídeo na interface
+
+        O frame já chega no tamanho do preview; aqui só há o empacotamento
+        em QImage (BGR direto, sem cópia) e o desenho dos overlays.
+        """
+        self.camera_thread.render_times.append(time.perf_counter())
+        with self.camera_thread.stage_timer.measure('update_frame'):
+            if not frame.flags['C_CONTIGUOUS']:
+                frame = np.ascontiguousarray(frame)
+            h, w = frame.shape[:2]
+            if QIMAGE_FORMAT_BGR888 is not None:
+                qt_image = QImage(frame.data, w, h, frame.strides[0], QIMAGE_FORMAT_BGR888)
+            else:
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                qt_image = QImage(frame.data, w, h, frame.strides[0], QImage.Format_RGB888)
+            pixmap = QPixmap.fromImage(qt_image)
+            self.draw_overlay(pixmap, overlay)
+            self.video_label.setPixmap(pixmap)
+    
+    def draw_overlay(self, pixmap: QPixmap, overlay: dict):
+        """Desenha retângulos, legendas, inspeção e desempenho sobre o preview"""
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing)
+        
+        # Retângulos verdes e legendas (tipo + conteúdo)
+        green = QColor(0, 255, 0)
+        painter.setFont(QFont("Arial", 9, QFont.Bold))
+        for (x, y, w, h), label in overlay.get('boxes', ()):
+            painter.setPen(QPen(green, 2))
+            painter.drawRect(x, y, w, h)
+            painter.drawText(x, max(12, y - 5), label)
+        
+        inspection_info = overlay.get('inspection')
+        if inspection_info is not None:
+            detected_count, expected_codes, elapsed, timeout = inspection_info
+            painter.setPen(QColor(205, 90, 106))
+            painter.setFont(QFont("Arial", 14, QFont.Bold))
+            painter.drawText(10, 25, f"Detectados: {detected_count}/{expected_codes}")
+            painter.drawText(10, 50, f"Tempo: {elapsed:.1f}s / {timeout}s")
+        
+        # FPS e tempos por etapa no canto inferior esquerdo
+        lines = overlay.get('stats')
+        if lines:
+            line_height = 14
+            top = pixmap.height() - 8 - line_height * len(lines)
+            painter.fillRect(4, top - 4, 250, line_height * len(lines) + 8, QColor(0, 0, 0, 190))
+            painter.setPen(QColor(255, 255, 0))
+            painter.setFont(QFont("Monospace", 8))
+            for i, line in enumerate(lines):
+                painter.drawText(8, top + line_height * (i + 1) - 3, line)
+        painter.end()
     
     def on_code_detected(self, code_data: dict):
         """Callback quando um código é detectado"""
@@ -1126,9 +1426,7 @@ class MainWindow(QMainWindow):
         code_type = code_data['type']
         code_value = code_data['data']
         
-        history_text = f"[{timestamp}] {code_type}: {code_value}"
-        self.history_list.addItem(history_text)
-        self.history_list.scrollToBottom()
+        self.history_model.append({'timestamp': timestamp, 'type': code_type, 'data': code_value})
         
         try:
             expected = int(self.txt_expected.text())
@@ -1136,114 +1434,30 @@ class MainWindow(QMainWindow):
             expected = 1
         
         if len(self.current_thumbnails) < expected:
-            self.add_thumbnail(code_data['image'], code_type, code_value, expected)
+            self.add_thumbnail(code_data['thumbnail'], code_type, code_value, expected)
     
     def clear_thumbnails(self):
-        """Limpa todas as miniaturas"""
-        while self.thumbnails_layout.count():
-            item = self.thumbnails_layout.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
+        """Limpa todas as miniaturas (os blocos são apenas ocultados)"""
+        for tile in self.current_thumbnails:
+            tile.clear()
         self.current_thumbnails.clear()
     
-    def add_thumbnail(self, img: np.ndarray, code_type: str, code_value: str, max_codes: int):
-        """Adiciona miniatura do código detectado em grid com tamanho FIXO
+    def add_thumbnail(self, thumbnail: Optional[QImage], code_type: str, code_value: str, max_codes: int):
+        """Mostra a miniatura do código no próximo bloco livre do grid
         
-        Layout otimizado para caber até 8 códigos em 2 colunas
+        Layout otimizado para caber até 8 códigos em 2 colunas; a imagem já
+        chega reduzida (make_thumbnail, thread de decodificação).
         """
-        if img.size == 0:
+        if thumbnail is None or thumbnail.isNull():
             return
         
         index = len(self.current_thumbnails)
-        row = index // 2
-        col = index % 2
-        
-        # ✅ TAMANHO REDUZIDO: 120x100 (era 150x130)
-        thumb_widget = QWidget()
-        thumb_widget.setFixedSize(140, 140)  # Container compacto
-        thumb_layout = QVBoxLayout(thumb_widget)
-        thumb_layout.setContentsMargins(3, 3, 3, 3)
-        thumb_layout.setSpacing(3)
-        
-        # ============ PROCESSAMENTO DA IMAGEM ============
-        
-        # Verifica se é escala de cinza ou colorida
-        if len(img.shape) == 2:
-            # Escala de cinza ou binarizada
-            h, w = img.shape
-            
-            # Converte para RGB para exibição no Qt
-            if img.dtype == np.uint8 and len(np.unique(img)) <= 2:
-                # Imagem binarizada (preto e branco puro)
-                rgb_img = cv2.cvtColor(img, cv2.COLOR_GRAY2RGB)
-            else:
-                # Escala de cinza normal
-                rgb_img = cv2.cvtColor(img, cv2.COLOR_GRAY2RGB)
-            
-            bytes_per_line = 3 * w
-            qt_format = QImage.Format_RGB888
-        else:
-            # Imagem colorida
-            h, w, ch = img.shape
-            rgb_img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            bytes_per_line = ch * w
-            qt_format = QImage.Format_RGB888
-        
-        # ============ CRIA QIMAGE ============
-        
-        qt_image = QImage(rgb_img.data, w, h, bytes_per_line, qt_format)
-        pixmap = QPixmap.fromImage(qt_image)
-        
-        # ✅ LABEL COM TAMANHO REDUZIDO: 120x100 pixels
-        img_label = QLabel()
-        img_label.setFixedSize(120, 100)
-        img_label.setAlignment(Qt.AlignCenter)
-        
-        # ✅ ESCALA para preencher exatamente o espaço
-        scaled_pixmap = pixmap.scaled(
-            120, 100,
-            Qt.KeepAspectRatio,
-            Qt.SmoothTransformation
-        )
-        
-        img_label.setPixmap(scaled_pixmap)
-        
-        # ✅ BORDA VERDE + FUNDO BRANCO (mais fina)
-        img_label.setStyleSheet("""
-            border: 2px solid #4CAF50;
-            background-color: white;
-            padding: 1px;
-        """)
-        
-        thumb_layout.addWidget(img_label)
-        
-        # ============ TEXTO COMPACTO ============
-        
-        # Trunca texto longo
-        display_text = code_value
-        if len(display_text) > 15:
-            display_text = display_text[:12] + "..."
-        
-        text_label = QLabel(f"{code_type}\n{display_text}")
-        text_label.setAlignment(Qt.AlignCenter)
-        text_label.setWordWrap(True)
-        text_label.setFixedHeight(30)  # Reduzido de 50 para 30
-        text_label.setStyleSheet("""
-            font-size: 8px;
-            color: #333;
-            font-weight: bold;
-            background-color: #f0f0f0;
-            border: 1px solid #ccc;
-            border-radius: 3px;
-            padding: 2px;
-        """)
-        
-        thumb_layout.addWidget(text_label)
-        
-        # ============ ADICIONA AO GRID ============
+        if index >= min(max_codes, len(self.thumbnail_tiles)):
+            return
         
-        self.thumbnails_layout.addWidget(thumb_widget, row, col)
-        self.current_thumbnails.append(thumb_widget)
+        tile = self.thumbnail_tiles[index]
+        tile.show_code(thumbnail, code_type, code_value)
+        self.current_thumbnails.append(tile)
     
     def start_inspection(self):
         """Inicia ciclo de inspeção"""
@@ -1342,6 +1556,49 @@ class MainWindow(QMainWindow):
     def toggle_fast_mode(self, checked: bool):
         """Alterna modo rápido"""
         self.camera_thread.frame_skip = 3 if checked else 1
+        # Prazo acompanha o intervalo entre frames decodificados
+        self.camera_thread.engine.scheduler.deadline_ms = DEFAULT_DEADLINE_MS * self.camera_thread.frame_skip
+    
+    def enable_metrics(self, port: int, host: str = "127.0.0.1"):
+        """Publica as métricas da estação em http://host:port/metrics"""
+        registry = MetricsRegistry()
+        self.camera_thread.enable_metrics(registry)
+        try:
+            self.metrics_server = MetricsServer(registry, port=port, host=host).start()
+        except OSError as e:
+            print(f"⚠️ Não foi possível abrir o servidor de métricas em {host}:{port}: {e}")
+            return
+        print(f"📡 Métricas em http://{host}:{self.metrics_server.port}/metrics")
+    
+    def toggle_stats_overlay(self, checked: bool):
+        """Liga/desliga o overlay de FPS e tempos por etapa"""
+        self.camera_thread.show_stats = checked
+        print(f"📈 Overlay de desempenho: {'ativado' if checked else 'desativado'}")
+    
+    def export_stage_times(self):
+        """Salva resumo e histogramas dos tempos por etapa em JSON"""
+        default_name = f"tempos_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        filename, _ = QFileDialog.getSaveFileName(self, "Exportar Tempos por Etapa", default_name,
+                                                  "JSON Files (*.json)")
+        if not filename:
+            return
+        
+        try:
+            with open(filename, 'w', encoding='utf-8') as f:
+                json.dump(self.camera_thread.export_stage_times(), f, indent=4, ensure_ascii=False)
+            print(f"📊 Tempos por etapa exportados para: {filename}")
+        except Exception as e:
+            print(f"⚠️ Erro ao exportar tempos por etapa: {e}")
+    
+    def toggle_pyramid(self, checked: bool):
+        """Alterna decodificação coarse-to-fine (1/2 → resolução total)"""
+        self.camera_thread.engine.pyramid_scale = 0.5 if checked else 1.0
+    
+    def update_symbologies(self):
+        """Aplica a lista de simbologias do campo de texto no motor"""
+        names = [n for n in self.txt_symbologies.text().replace(";", ",").split(",") if n.strip()]
+        self.camera_thread.engine.set_symbologies(names)
+        print(f"🔣 Simbologias: {', '.join(self.camera_thread.engine.symbologies) or 'todas'}")
     
     def update_pdi(self, param: str, value):
         """Atualiza parâmetro de PDI"""
@@ -1359,6 +1616,16 @@ class MainWindow(QMainWindow):
             finally:
                 self.camera_thread.params_mutex.unlock()
             
+            # ✅ Simbologias do modelo e estatísticas de acerto por versão de PDI
+            config["symbologies"] = list(self.camera_thread.engine.symbologies)
+            config["variant_stats"] = self.camera_thread.engine.variant_stats.to_dict()
+            
+            # ✅ Limites do fallback no frame completo (ajustados por estação)
+            config["fallback"] = {
+                "min_likelihood": self.camera_thread.engine.fallback_min_likelihood,
+                "interval_ms": self.camera_thread.engine.fallback_interval_ms,
+            }
+            
             counter = 1
             while True:
                 filename = f"modelo{counter}.json"
@@ -1374,6 +1641,7 @@ class MainWindow(QMainWindow):
             with open(filename, 'w', encoding='utf-8') as f:
                 json.dump(config, f, indent=4, ensure_ascii=False)
             
+            self.current_recipe = Path(filename)
             print(f"✅ Configuração salva com sucesso em: {filename}")
             print(f"📄 Conteúdo: {config}")
             
@@ -1447,6 +1715,25 @@ class MainWindow(QMainWindow):
             self.update_slider_value(self.slider_beta, "beta", config)
             self.update_slider_value(self.slider_alpha, "alpha", config, is_float=True)
             
+            # ✅ Simbologias e estatísticas de PDI não são parâmetros de câmera
+            symbologies = config.pop("symbologies", None)
+            if isinstance(symbologies, list):
+                self.txt_symbologies.setText(", ".join(symbologies))
+                self.update_symbologies()
+            
+            variant_stats = config.pop("variant_stats", None)
+            if isinstance(variant_stats, dict):
+                self.camera_thread.engine.variant_stats.load_dict(variant_stats)
+                print(f"📊 Estatísticas de PDI carregadas ({len(variant_stats)} simbologia(s))")
+            
+            fallback = config.pop("fallback", None)
+            if isinstance(fallback, dict):
+                engine = self.camera_thread.engine
+                engine.fallback_min_likelihood = float(fallback.get("min_likelihood", FALLBACK_MIN_LIKELIHOOD))
+                engine.fallback_interval_ms = float(fallback.get("interval_ms", FALLBACK_INTERVAL_MS))
+                print(f"🔁 Fallback: indício ≥ {engine.fallback_min_likelihood:.3f}, "
+                      f"a cada ≥ {engine.fallback_interval_ms:.0f} ms")
+            
             print("🔒 Aplicando na thread...")
             self.camera_thread.params_mutex.lock()
             try:
@@ -1456,6 +1743,7 @@ class MainWindow(QMainWindow):
             finally:
                 self.camera_thread.params_mutex.unlock()
             
+            self.current_recipe = filename
             print(f"✅ Configuração carregada de: {filename}")
             
             original_text = self.btn_load_config.text()
@@ -1506,10 +1794,30 @@ class MainWindow(QMainWindow):
         QTimer.singleShot(3000, lambda: self.btn_load_config.setText(original_text))
         QTimer.singleShot(3000, lambda: self.btn_load_config.setStyleSheet(""))
     
+    def save_recipe_stats(self):
+        """Atualiza as estatísticas de PDI no modelo ativo (se houver)"""
+        if self.current_recipe is None or not self.current_recipe.exists():
+            return
+        
+        try:
+            with open(self.current_recipe, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+            config["variant_stats"] = self.camera_thread.engine.variant_stats.to_dict()
+            with open(self.current_recipe, 'w', encoding='utf-8') as f:
+                json.dump(config, f, indent=4, ensure_ascii=False)
+            print(f"📊 Estatísticas de PDI salvas em: {self.current_recipe}")
+        except Exception as e:
+            print(f"⚠️ Erro ao salvar estatísticas de PDI: {e}")
+    
     def closeEvent(self, event):
         """Cleanup ao fechar a aplicação"""
         print("🛑 Fechando aplicação...")
         self.camera_thread.stop()
+        self.save_recipe_stats()
+        self.flush_history()
+        self.history_model.store.close()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
         print("✅ Aplicação fechada com sucesso!")
         event.accept()
 
@@ -1580,6 +1888,8 @@ class MainWindow(QMainWindow):
             <li><b>ESC</b> - Sair da tela cheia</li>
             <li><b>Ctrl+Q</b> - Fechar aplicação</li>
             <li><b>Ctrl+M</b> - Minimizar janela</li>
+            <li><b>F3</b> - Overlay de FPS e tempos por etapa</li>
+            <li><b>Ctrl+E</b> - Exportar tempos por etapa (JSON)</li>
         </ul>
         
         <h3>Dicas para FHD-03:</h3>
@@ -1624,12 +1934,32 @@ def main():
         print("   O sistema não conseguirá detectar códigos.")
         print()
     
-    app = QApplication(sys.argv)
+    # Fonte opcional pela linha de comando (demais argumentos ficam para o Qt)
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--source', help="camera:N, video:arquivo, folder:pasta ou synthetic[:TEXTO,...]")
+    parser.add_argument('--preview-hz', type=float, default=PREVIEW_REFRESH_HZ,
+                        help=f"Atualizações do vídeo por segundo (padrão {PREVIEW_REFRESH_HZ})")
+    parser.add_argument('--metrics-port', type=int, nargs='?', const=DEFAULT_METRICS_PORT,
+                        help=f"Publica métricas Prometheus em /metrics (padrão {DEFAULT_METRICS_PORT})")
+    parser.add_argument('--metrics-host', default="127.0.0.1",
+                        help="Interface do servidor de métricas (0.0.0.0 = acessível na rede)")
+    args, qt_args = parser.parse_known_args(sys.argv[1:])
+    
+    app = QApplication([sys.argv[0]] + qt_args)
     app.setStyle('Fusion')
     
     window = MainWindow()
     window.show()
     
+    if args.preview_hz != PREVIEW_REFRESH_HZ:
+        window.set_preview_rate(args.preview_hz)
+    
+    if args.metrics_port is not None:
+        window.enable_metrics(args.metrics_port, args.metrics_host)
+    
+    if args.source:
+        window.open_source_spec(args.source)
+    
     print("✅ Interface carregada com sucesso!")
     print()
     print("📌 Otimizações aplicadas para FHD-03:")
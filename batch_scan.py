@@ -0,0 +1,340 @@
+"""
+=======================================================================================
+VARREDURA OFFLINE EM LOTE (sem interface gráfica)
+=======================================================================================
+Re-processa arquivos de imagens e vídeos gravados com o mesmo DetectionEngine
+da interface, em um pool de processos (um motor "aquecido" por worker).
+
+Uso:
+    python batch_scan.py fotos/ "arquivo/**/*.png" linha3.mp4 -o resultados.csv
+    python batch_scan.py gravacoes/ --format jsonl --workers 16 --every 5
+    python batch_scan.py fotos/ -o resultados.json          # array JSON (.jsonl = uma linha por código)
+    python batch_scan.py fotos/ --recipe modelo3.json     # simbologias/fallback do modelo
+    python batch_scan.py --source synthetic --max-frames 300    # fonte de frames (sequencial)
+
+Saída (uma linha por código, gravada à medida que os resultados chegam):
+    file, frame, type, data, bbox (x, y, w, h), decode_ms
+Imagens usam frame = 0. Progresso e resumo vão para stderr.
+=======================================================================================
+"""
+
+import os
+import sys
+import csv
+import cv2
+import glob
+import json
+import time
+import argparse
+import multiprocessing
+from pathlib import Path
+from typing import Optional, List, Dict, Iterable, Iterator, Tuple
+
+from detection_engine import DetectionEngine
+from frame_sources import IMAGE_EXTENSIONS, VIDEO_EXTENSIONS, open_source
+
+# Vídeos longos são divididos em trechos para usar todos os workers
+VIDEO_SEGMENT_FRAMES = 300
+
+FIELDS = ('file', 'frame', 'type', 'data', 'bbox', 'decode_ms')
+
+
+# ==================== WORKER (UM MOTOR POR PROCESSO) ====================
+_engine: Optional[DetectionEngine] = None
+
+
+def _init_worker(engine_options: Dict, recipe: Optional[Dict]):
+    """Cria o motor do processo uma única vez (scanners e pool já aquecidos)"""
+    global _engine
+    # O paralelismo vem dos processos: OpenCV em 1 thread evita disputa de núcleos
+    cv2.setNumThreads(1)
+    _engine = DetectionEngine(workers=1, **engine_options)
+    if recipe:
+        apply_recipe(_engine, recipe)
+
+
+def _scan_frame(file: str, index: int, frame) -> List[Dict]:
+    start = time.perf_counter()
+    codes = _engine.scan(frame)
+    decode_ms = (time.perf_counter() - start) * 1000.0
+    if not codes:
+        return [{'file': file, 'frame': index, 'type': '', 'data': '', 'bbox': None, 'decode_ms': decode_ms}]
+    return [{
+        'file': file,
+        'frame': index,
+        'type': code['type'],
+        'data': code['data'],
+        'bbox': [int(v) for v in code['bbox']],
+        'decode_ms': decode_ms,
+    } for code in codes]
+
+
+def _run_task(task: Tuple) -> Tuple[int, List[Dict]]:
+    """Executa uma tarefa: ('image', caminho) ou ('video', caminho, início, fim, passo)
+
+    Retorna (frames processados, linhas).
+    """
+    if task[0] == 'image':
+        path = task[1]
+        frame = cv2.imread(path, cv2.IMREAD_COLOR)
+        if frame is None:
+            print(f"⚠️ Não foi possível ler: {path}", file=sys.stderr)
+            return 0, []
+        return 1, _scan_frame(path, 0, frame)
+
+    _, path, first, last, every = task
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        print(f"⚠️ Não foi possível abrir: {path}", file=sys.stderr)
+        return 0, []
+    if first > 0:
+        capture.set(cv2.CAP_PROP_POS_FRAMES, first)
+
+    rows, frames, index = [], 0, first
+    try:
+        while last is None or index < last:
+            # Frames pulados: grab() sem decodificar a imagem
+            if (index - first) % every:
+                if not capture.grab():
+                    break
+                index += 1
+                continue
+            ok, frame = capture.read()
+            if not ok:
+                break
+            rows.extend(_scan_frame(path, index, frame))
+            frames += 1
+            index += 1
+    finally:
+        capture.release()
+    return frames, rows
+
+
+# ==================== ENTRADAS ====================
+def expand_inputs(inputs: Iterable[str]) -> List[str]:
+    """Pastas (recursivo), globs e arquivos → lista ordenada de arquivos suportados"""
+    files = []
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            candidates = (str(p) for p in sorted(path.rglob('*')) if p.is_file())
+        elif path.is_file():
+            candidates = [item]
+        else:
+            candidates = sorted(glob.glob(item, recursive=True))
+            if not candidates:
+                print(f"⚠️ Nada encontrado para: {item}", file=sys.stderr)
+        for candidate in candidates:
+            suffix = Path(candidate).suffix.lower()
+            if suffix in IMAGE_EXTENSIONS or suffix in VIDEO_EXTENSIONS:
+                files.append(candidate)
+    return list(dict.fromkeys(files))  # Remove repetidos mantendo a ordem
+
+
+def build_tasks(files: List[str], every: int = 1,
+                segment_frames: int = VIDEO_SEGMENT_FRAMES) -> List[Tuple]:
+    """Uma tarefa por imagem; vídeos divididos em trechos de `segment_frames`"""
+    tasks = []
+    for file in files:
+        if Path(file).suffix.lower() in IMAGE_EXTENSIONS:
+            tasks.append(('image', file))
+            continue
+        capture = cv2.VideoCapture(file)
+        total = int(capture.get(cv2.CAP_PROP_FRAME_COUNT)) if capture.isOpened() else 0
+        capture.release()
+        if total <= 0:
+            tasks.append(('video', file, 0, None, every))  # Duração desconhecida: um trecho só
+            continue
+        # Trechos alinhados ao passo para não repetir nem pular frames
+        step = max(every, segment_frames - segment_frames % every)
+        for first in range(0, total, step):
+            tasks.append(('video', file, first, min(total, first + step), every))
+    return tasks
+
+
+def apply_recipe(engine: DetectionEngine, recipe: Dict):
+    """Aplica ao motor os campos de decodificação de um modeloN.json"""
+    if isinstance(recipe.get('symbologies'), list):
+        engine.set_symbologies(recipe['symbologies'])
+    if isinstance(recipe.get('variant_stats'), dict):
+        engine.variant_stats.load_dict(recipe['variant_stats'])
+    fallback = recipe.get('fallback')
+    if isinstance(fallback, dict):
+        engine.fallback_min_likelihood = float(fallback.get('min_likelihood', 0.0))
+        engine.fallback_interval_ms = float(fallback.get('interval_ms', 0.0))
+
+
+# ==================== SAÍDA ====================
+class ResultWriter:
+    """Grava linhas em CSV, JSONL ou JSON à medida que chegam (flush por lote)
+
+    'json' é um único array: os itens saem conforme chegam e close() fecha
+    o colchete (o arquivo só é JSON válido depois do close).
+    """
+
+    def __init__(self, stream, fmt: str):
+        self.stream = stream
+        self.fmt = fmt
+        self._csv = None
+        self._rows = 0
+        if fmt == 'csv':
+            self._csv = csv.writer(stream)
+            self._csv.writerow(FIELDS)
+        elif fmt == 'json':
+            self.stream.write('[')
+
+    def write(self, rows: List[Dict]):
+        for row in rows:
+            if self._csv is not None:
+                bbox = ' '.join(str(v) for v in row['bbox']) if row['bbox'] else ''
+                self._csv.writerow([row['file'], row['frame'], row['type'], row['data'],
+                                    bbox, f"{row['decode_ms']:.2f}"])
+            else:
+                line = json.dumps(dict(row, decode_ms=round(row['decode_ms'], 2)), ensure_ascii=False)
+                if self.fmt == 'json':
+                    line = ('\n  ' if self._rows == 0 else ',\n  ') + line
+                else:
+                    line += '\n'
+                self.stream.write(line)
+            self._rows += 1
+        self.stream.flush()
+
+    def close(self):
+        """Finaliza a saída (fecha o array JSON)"""
+        if self.fmt == 'json':
+            self.stream.write('\n]\n' if self._rows else ']\n')
+            self.stream.flush()
+
+
+def scan_source(spec: str, writer: ResultWriter, engine_options: Dict,
+                recipe: Optional[Dict] = None, include_empty: bool = False,
+                max_frames: Optional[int] = None, realtime: bool = False) -> Dict[str, float]:
+    """Varre uma fonte de frames (câmera, vídeo, pasta, sintética) em sequência"""
+    summary = {'frames': 0, 'codes': 0, 'decode_ms': 0.0}
+    source = open_source(spec, realtime=realtime)
+    if not source.isOpened():
+        print(f"❌ Não foi possível abrir a fonte: {spec}", file=sys.stderr)
+        return summary
+
+    _init_worker(engine_options, recipe)
+    try:
+        while max_frames is None or summary['frames'] < max_frames:
+            ok, frame = source.read()
+            if not ok:
+                break
+            rows = _scan_frame(source.description, summary['frames'], frame)
+            summary['frames'] += 1
+            summary['decode_ms'] += rows[0]['decode_ms']
+            found = [r for r in rows if r['type']]
+            summary['codes'] += len(found)
+            writer.write(rows if include_empty else found)
+    finally:
+        source.release()
+    return summary
+
+
+def scan_batch(tasks: List[Tuple], writer: ResultWriter, workers: int,
+               engine_options: Dict, recipe: Optional[Dict] = None,
+               include_empty: bool = False) -> Dict[str, float]:
+    """Executa as tarefas no pool e grava os resultados; retorna um resumo"""
+    summary = {'frames': 0, 'codes': 0, 'decode_ms': 0.0}
+
+    def consume(results: Iterator[Tuple[int, List[Dict]]]):
+        for frames, rows in results:
+            summary['frames'] += frames
+            # Tempo por frame aparece repetido em cada código do mesmo frame
+            summary['decode_ms'] += sum({(r['file'], r['frame']): r['decode_ms'] for r in rows}.values())
+            found = [r for r in rows if r['type']]
+            summary['codes'] += len(found)
+            writer.write(rows if include_empty else found)
+
+    if workers <= 1:
+        _init_worker(engine_options, recipe)
+        consume(map(_run_task, tasks))
+    else:
+        with multiprocessing.Pool(workers, initializer=_init_worker,
+                                  initargs=(engine_options, recipe)) as pool:
+            # Sem ordem: cada resultado é gravado assim que um worker termina
+            consume(pool.imap_unordered(_run_task, tasks, chunksize=1))
+    return summary
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Varredura offline de códigos 1D/2D em imagens e vídeos")
+    parser.add_argument('inputs', nargs='*', help="Pastas, arquivos ou globs (use aspas)")
+    parser.add_argument('--source', help="Fonte de frames: camera:N, video:arquivo, folder:pasta, synthetic[:TEXTO,...]")
+    parser.add_argument('--max-frames', type=int, help="Com --source, para após N frames")
+    parser.add_argument('--realtime', action='store_true', help="Com --source, respeita o FPS da fonte")
+    parser.add_argument('-o', '--output', help="Arquivo de saída (padrão: stdout)")
+    parser.add_argument('--format', choices=('csv', 'jsonl', 'json'),
+                        help="Formato da saída (padrão: pela extensão de --output, senão csv)")
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1,
+                        help="Processos em paralelo (padrão: núcleos da máquina)")
+    parser.add_argument('--every', type=int, default=1, help="Em vídeos, processa 1 a cada N frames")
+    parser.add_argument('--recipe', help="modeloN.json com simbologias/estatísticas/fallback")
+    parser.add_argument('--thorough', action='store_true', help="Tenta todas as versões de PDI")
+    parser.add_argument('--no-localizer', action='store_true', help="ETAPA 1 no frame inteiro")
+    parser.add_argument('--pyramid', type=float, default=1.0, help="Escala coarse-to-fine (ex: 0.5)")
+    parser.add_argument('--include-empty', action='store_true',
+                        help="Grava também frames sem código (type/data vazios)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if not args.inputs and not args.source:
+        print("❌ Informe arquivos/pastas ou --source", file=sys.stderr)
+        return 1
+
+    recipe = None
+    if args.recipe:
+        with open(args.recipe, 'r', encoding='utf-8') as f:
+            recipe = json.load(f)
+
+    fmt = args.format
+    if fmt is None:
+        suffix = Path(args.output).suffix.lower() if args.output else ''
+        fmt = {'.jsonl': 'jsonl', '.json': 'json'}.get(suffix, 'csv')
+    engine_options = {
+        'thorough': args.thorough,
+        'localizer': not args.no_localizer,
+        'pyramid_scale': args.pyramid,
+    }
+
+    if args.source:
+        tasks, workers = [], 1
+        print(f"🔍 Fonte: {args.source}", file=sys.stderr)
+    else:
+        files = expand_inputs(args.inputs)
+        if not files:
+            print("❌ Nenhuma imagem ou vídeo encontrado", file=sys.stderr)
+            return 1
+        tasks = build_tasks(files, max(1, args.every))
+        workers = max(1, min(args.workers, len(tasks)))
+        print(f"🔍 {len(files)} arquivo(s), {len(tasks)} tarefa(s), {workers} worker(s)", file=sys.stderr)
+    start = time.perf_counter()
+
+    stream = open(args.output, 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+    writer = ResultWriter(stream, fmt)
+    try:
+        if args.source:
+            summary = scan_source(args.source, writer, engine_options, recipe, args.include_empty,
+                                  args.max_frames, args.realtime)
+        else:
+            summary = scan_batch(tasks, writer, workers, engine_options, recipe, args.include_empty)
+    finally:
+        writer.close()
+        if args.output:
+            stream.close()
+
+    elapsed = time.perf_counter() - start
+    fps = summary['frames'] / elapsed if elapsed > 0 else 0.0
+    mean_ms = summary['decode_ms'] / summary['frames'] if summary['frames'] else 0.0
+    print(f"✅ {summary['frames']} frame(s), {summary['codes']} código(s) em {elapsed:.1f} s "
+          f"({fps:.1f} frames/s, {mean_ms:.1f} ms/frame por worker)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,326 @@
+"""
+=======================================================================================
+BENCHMARK SINTÉTICO DO DETECTOR
+=======================================================================================
+Gera frames rotulados (QR via cv2.QRCodeEncoder, CODE128 e EAN13 desenhados)
+com tamanho, rotação, perspectiva, desfoque, ruído e iluminação controlados,
+passa cada um pelo DetectionEngine e relata:
+  • taxa de decodificação (dado correto encontrado no frame)
+  • latência p50/p95/p99 por etapa (localize, rectify, clahe, threshold, zbar...)
+  • tudo por simbologia e por condição
+
+Uso:
+    python benchmark.py                          # JSON no stdout
+    python benchmark.py --frames 50 -o bench.json
+    python benchmark.py --symbologies QRCODE,EAN13 --conditions clean,blur
+
+O JSON inclui versões (Python/OpenCV/NumPy) e a semente, para comparar builds.
+=======================================================================================
+"""
+
+import sys
+import json
+import time
+import argparse
+import platform
+from datetime import datetime
+from typing import Optional, List, Dict, Tuple
+
+import cv2
+import numpy as np
+
+from detection_engine import DetectionEngine, PYZBAR_AVAILABLE
+
+
+FRAME_SIZE = (1280, 720)
+
+# Condições de captura (cada uma varia um fator a partir da imagem limpa)
+CONDITIONS = {
+    'clean':       {},
+    'small':       {'scale': 0.55},
+    'rotated':     {'rotation': 35.0},
+    'perspective': {'perspective': 0.12},
+    'blur':        {'blur': 1.6},
+    'noise':       {'noise': 12.0},
+    'dark':        {'gain': 0.45, 'offset': -10, 'gradient': 0.35},
+}
+
+
+# ==================== CODIFICADORES 1D ====================
+# Larguras (barra, espaço, ...) dos símbolos 0..106 do Code 128
+CODE128_PATTERNS = (
+    "212222", "222122", "222221", "121223", "121322", "131222", "122213", "122312", "132212", "221213",
+    "221312", "231212", "112232", "122132", "122231", "113222", "123122", "123221", "223211", "221132",
+    "221231", "213212", "223112", "312131", "311222", "321122", "321221", "312212", "322112", "322211",
+    "212123", "212321", "232121", "111323", "131123", "131321", "112313", "132113", "132311", "211313",
+    "231113", "231311", "112133", "112331", "132131", "113123", "113321", "133121", "313121", "211331",
+    "231131", "213113", "213311", "213131", "311123", "311321", "331121", "312113", "312311", "332111",
+    "314111", "221411", "431111", "111224", "111422", "121124", "121421", "141122", "141221", "112214",
+    "112412", "122114", "122411", "142112", "142211", "241211", "221114", "413111", "241112", "134111",
+    "111242", "121142", "121241", "114212", "124112", "124211", "411212", "421112", "421211", "212141",
+    "214121", "412121", "111143", "111341", "131141", "114113", "114311", "411113", "411311", "113141",
+    "114131", "311141", "411131", "211412", "211214", "211232", "2331112",
+)
+CODE128_START_B = 104
+CODE128_STOP = 106
+
+EAN_L = ("0001101", "0011001", "0010011", "0111101", "0100011",
+         "0110001", "0101111", "0111011", "0110111", "0001011")
+EAN_R = tuple(''.join('1' if bit == '0' else '0' for bit in code) for code in EAN_L)
+EAN_G = tuple(code[::-1] for code in EAN_R)
+EAN_PARITY = ("LLLLLL", "LLGLGG", "LLGGLG", "LLGGGL", "LGLLGG",
+              "LGGLLG", "LGGGLL", "LGLGLG", "LGLGGL", "LGGLGL")
+
+
+def code128_modules(text: str) -> str:
+    """Módulos ('1' barra, '0' espaço) do Code 128 conjunto B, com checksum"""
+    values = [CODE128_START_B] + [ord(ch) - 32 for ch in text]
+    checksum = (values[0] + sum(i * v for i, v in enumerate(values[1:], start=1))) % 103
+    modules = []
+    for value in values + [checksum, CODE128_STOP]:
+        for i, width in enumerate(CODE128_PATTERNS[value]):
+            modules.append(('1' if i % 2 == 0 else '0') * int(width))
+    return ''.join(modules)
+
+
+def ean13_check_digit(digits: str) -> str:
+    total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(digits[:12]))
+    return str((10 - total % 10) % 10)
+
+
+def ean13_modules(digits: str) -> str:
+    """Módulos do EAN-13 (12 dígitos + dígito verificador calculado)"""
+    digits = digits[:12] + ean13_check_digit(digits)
+    parity = EAN_PARITY[int(digits[0])]
+    left = ''.join((EAN_L if p == 'L' else EAN_G)[int(d)] for p, d in zip(parity, digits[1:7]))
+    right = ''.join(EAN_R[int(d)] for d in digits[7:])
+    return '101' + left + '01010' + right + '101'
+
+
+def render_linear(modules: str, module_px: int = 3, height: int = 120, quiet: int = 10) -> np.ndarray:
+    """Desenha módulos 1D como imagem em cinza (com zona de silêncio)"""
+    row = np.array([0 if m == '1' else 255 for m in '0' * quiet + modules + '0' * quiet], np.uint8)
+    row = np.repeat(row, module_px)
+    image = np.tile(row, (height, 1))
+    return cv2.copyMakeBorder(image, 12, 12, 0, 0, cv2.BORDER_CONSTANT, value=255)
+
+
+def render_qr(text: str, module_px: int = 5) -> np.ndarray:
+    qr = cv2.QRCodeEncoder.create().encode(text)
+    qr = cv2.resize(qr, None, fx=module_px, fy=module_px, interpolation=cv2.INTER_NEAREST)
+    return cv2.copyMakeBorder(qr, 4 * module_px, 4 * module_px, 4 * module_px, 4 * module_px,
+                              cv2.BORDER_CONSTANT, value=255)
+
+
+def render_code(symbology: str, data: str) -> np.ndarray:
+    if symbology == 'QRCODE':
+        return render_qr(data)
+    if symbology == 'CODE128':
+        return render_linear(code128_modules(data))
+    if symbology == 'EAN13':
+        return render_linear(ean13_modules(data))
+    raise ValueError(f"Simbologia sem gerador: {symbology}")
+
+
+def sample_data(symbology: str, rng: np.random.Generator) -> str:
+    """Conteúdo aleatório válido para a simbologia (EAN13 já com verificador)"""
+    if symbology == 'EAN13':
+        digits = ''.join(str(d) for d in rng.integers(0, 10, 12))
+        return digits + ean13_check_digit(digits)
+    return f"PECA-{int(rng.integers(0, 10 ** 6)):06d}"
+
+
+# ==================== DISTORÇÕES ====================
+def compose_frame(code: np.ndarray, rng: np.random.Generator, scale: float = 1.0,
+                  rotation: float = 0.0, perspective: float = 0.0, blur: float = 0.0,
+                  noise: float = 2.0, gain: float = 1.0, offset: float = 0.0,
+                  gradient: float = 0.0, size: Tuple[int, int] = FRAME_SIZE) -> np.ndarray:
+    """Posiciona o código num frame com a distorção pedida"""
+    width, height = size
+    h, w = code.shape[:2]
+    w, h = w * scale, h * scale
+
+    # Cantos do código no frame: centro aleatório, rotação, jitter de perspectiva
+    cx = rng.uniform(w, width - w) if width > 2 * w else width / 2
+    cy = rng.uniform(h, height - h) if height > 2 * h else height / 2
+    corners = np.float32([[-w / 2, -h / 2], [w / 2, -h / 2], [w / 2, h / 2], [-w / 2, h / 2]])
+    angle = np.deg2rad(rotation * rng.choice((-1, 1)))
+    rot = np.float32([[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]])
+    corners = corners @ rot.T
+    corners += rng.uniform(-perspective, perspective, corners.shape).astype(np.float32) * max(w, h)
+    corners += np.float32([cx, cy])
+
+    source = np.float32([[0, 0], [code.shape[1], 0], [code.shape[1], code.shape[0]], [0, code.shape[0]]])
+    matrix = cv2.getPerspectiveTransform(source, corners)
+    # Fundo (fora do código) mais escuro que o branco do código
+    frame = cv2.warpPerspective(code, matrix, size, flags=cv2.INTER_LINEAR,
+                                borderMode=cv2.BORDER_CONSTANT, borderValue=170).astype(np.float32)
+    if blur > 0:
+        frame = cv2.GaussianBlur(frame, (0, 0), blur)
+
+    # Iluminação: ganho, deslocamento e gradiente horizontal
+    ramp = 1.0 - gradient * np.linspace(0, 1, width, dtype=np.float32)[None, :]
+    frame = frame * gain * ramp + offset
+    if noise > 0:
+        frame += rng.normal(0, noise, frame.shape).astype(np.float32)
+    frame = np.clip(frame, 0, 255).astype(np.uint8)
+    return cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+
+
+def generate_cases(symbologies: List[str], conditions: List[str], frames: int,
+                   seed: int = 0) -> List[Dict]:
+    """Lista de casos rotulados: simbologia, condição, dado esperado, frame"""
+    rng = np.random.default_rng(seed)
+    cases = []
+    for symbology in symbologies:
+        for condition in conditions:
+            for _ in range(frames):
+                data = sample_data(symbology, rng)
+                frame = compose_frame(render_code(symbology, data), rng, **CONDITIONS[condition])
+                cases.append({'symbology': symbology, 'condition': condition, 'data': data, 'frame': frame})
+    return cases
+
+
+# ==================== EXECUÇÃO E RELATÓRIO ====================
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    p50, p95, p99 = np.percentile(values, (50, 95, 99))
+    return {'mean_ms': float(np.mean(values)), 'p50_ms': float(p50),
+            'p95_ms': float(p95), 'p99_ms': float(p99), 'max_ms': float(max(values))}
+
+
+def _group_report(results: List[Dict], stages: Dict) -> Dict:
+    decoded = sum(r['decoded'] for r in results)
+    return {
+        'frames': len(results),
+        'decoded': decoded,
+        'decode_rate': decoded / len(results) if results else 0.0,
+        'latency': _percentiles([r['ms'] for r in results]),
+        'stages': stages,
+    }
+
+
+def run_benchmark(cases: List[Dict], engine_options: Optional[Dict] = None,
+                  warmup: int = 3) -> Dict:
+    """Passa os casos pelo motor e monta o relatório por simbologia e condição"""
+    engine = DetectionEngine(**(engine_options or {}))
+    try:
+        # Aquecimento: primeiras chamadas pagam criação de scanners e pool
+        for case in cases[:warmup]:
+            engine.scan(case['frame'])
+
+        results = []
+        by_symbology = {}
+        for symbology in dict.fromkeys(c['symbology'] for c in cases):
+            engine.stage_timer.reset()
+            group = []
+            for case in (c for c in cases if c['symbology'] == symbology):
+                start = time.perf_counter()
+                codes = engine.scan(case['frame'])
+                elapsed = (time.perf_counter() - start) * 1000.0
+                group.append({
+                    'symbology': symbology,
+                    'condition': case['condition'],
+                    'decoded': any(code['data'] == case['data'] for code in codes),
+                    'ms': elapsed,
+                })
+            by_symbology[symbology] = _group_report(group, engine.stage_summary())
+            results.extend(group)
+    finally:
+        engine.close()
+
+    by_condition = {}
+    for condition in dict.fromkeys(r['condition'] for r in results):
+        group = [r for r in results if r['condition'] == condition]
+        by_condition[condition] = _group_report(group, {})
+        by_condition[condition]['by_symbology'] = {
+            symbology: sum(r['decoded'] for r in group if r['symbology'] == symbology)
+            / max(1, sum(1 for r in group if r['symbology'] == symbology))
+            for symbology in dict.fromkeys(r['symbology'] for r in group)
+        }
+
+    overall = _group_report(results, {})
+    del overall['stages']
+    return {'overall': overall, 'by_symbology': by_symbology, 'by_condition': by_condition}
+
+
+def _rounded(value, digits: int = 3):
+    """Arredonda floats do relatório (JSON legível e diffs estáveis)"""
+    if isinstance(value, float):
+        return round(value, digits)
+    if isinstance(value, dict):
+        return {k: _rounded(v, digits) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_rounded(v, digits) for v in value]
+    return value
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark sintético do detector de códigos")
+    parser.add_argument('--frames', type=int, default=20, help="Frames por simbologia e condição")
+    parser.add_argument('--symbologies', default='QRCODE,CODE128,EAN13')
+    parser.add_argument('--conditions', default=','.join(CONDITIONS),
+                        help=f"Subconjunto de: {', '.join(CONDITIONS)}")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=1, help="Threads de refinamento do motor")
+    parser.add_argument('--thorough', action='store_true')
+    parser.add_argument('--no-localizer', action='store_true')
+    parser.add_argument('--pyramid', type=float, default=1.0)
+    parser.add_argument('-o', '--output', help="Arquivo JSON (padrão: stdout)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    symbologies = [s.strip().upper() for s in args.symbologies.split(',') if s.strip()]
+    conditions = [c.strip() for c in args.conditions.split(',') if c.strip()]
+    unknown = [c for c in conditions if c not in CONDITIONS]
+    if unknown:
+        print(f"❌ Condições desconhecidas: {', '.join(unknown)}", file=sys.stderr)
+        return 1
+    if not PYZBAR_AVAILABLE:
+        print("⚠️ pyzbar indisponível: taxa de decodificação será 0", file=sys.stderr)
+
+    engine_options = {
+        'workers': args.workers,
+        'thorough': args.thorough,
+        'localizer': not args.no_localizer,
+        'pyramid_scale': args.pyramid,
+    }
+
+    print(f"🧪 Gerando {len(symbologies) * len(conditions) * args.frames} frames...", file=sys.stderr)
+    cases = generate_cases(symbologies, conditions, args.frames, args.seed)
+
+    print("⏱️ Executando...", file=sys.stderr)
+    report = run_benchmark(cases, engine_options)
+    report['meta'] = {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'opencv': cv2.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'frames_per_case': args.frames,
+        'symbologies': symbologies,
+        'conditions': conditions,
+        'engine': engine_options,
+    }
+
+    text = json.dumps(_rounded(report), indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+        print(f"✅ Relatório salvo em: {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+    overall = report['overall']
+    print(f"📊 Decodificados: {overall['decoded']}/{overall['frames']} ({overall['decode_rate']:.0%}), "
+          f"p50 {overall['latency'].get('p50_ms', 0):.1f} ms, p95 {overall['latency'].get('p95_ms', 0):.1f} ms",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
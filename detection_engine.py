@@ -0,0 +1,1879 @@
+"""
+=======================================================================================
+MOTOR DE DETECÇÃO DE CÓDIGOS 1D/2D (sem dependência de PyQt5)
+=======================================================================================
+Contém todo o pipeline de PDI + decodificação usado pela CameraThread, isolado
+da interface gráfica para que possa ser usado em scripts, serviços, processos
+worker e benchmarks.
+
+Avisos vão para stderr (stdout fica livre para a saída de scripts).
+
+Uso básico:
+    from detection_engine import DetectionEngine
+
+    engine = DetectionEngine()
+    codes = engine.scan(frame)              # Um frame BGR
+    results = engine.scan_many(frames)      # Vários frames
+=======================================================================================
+"""
+
+import os
+import sys
+import cv2
+import time
+import threading
+import numpy as np
+from collections import OrderedDict, deque, namedtuple
+from functools import cached_property
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, Iterable, Callable, Tuple, Hashable, Sequence
+
+try:
+    from pyzbar import pyzbar
+    PYZBAR_AVAILABLE = True
+except ImportError:
+    PYZBAR_AVAILABLE = False
+    print("⚠️ pyzbar não instalado. Use: pip install pyzbar", file=sys.stderr)
+
+# Acesso de baixo nível ao zbar (scanner persistente). Usa funções internas
+# do pyzbar 0.1.9; se indisponíveis, cai para pyzbar.decode(symbols=...)
+try:
+    from pyzbar.pyzbar import _image, _pixel_data, _decode_symbols, _symbols_for_image, _FOURCC
+    from pyzbar.wrapper import (
+        zbar_image_scanner_create, zbar_image_scanner_destroy,
+        zbar_image_scanner_set_config, zbar_image_set_format, zbar_image_set_size,
+        zbar_image_set_data, zbar_scan_image, ZBarConfig,
+    )
+    from ctypes import cast, c_void_p
+    ZBAR_NATIVE_AVAILABLE = True
+except Exception:
+    ZBAR_NATIVE_AVAILABLE = False
+
+try:
+    from pylibdmtx import pylibdmtx
+    PYLIBDMTX_AVAILABLE = True
+except ImportError:
+    PYLIBDMTX_AVAILABLE = False
+    print("⚠️ pylibdmtx não instalado. Use: pip install pylibdmtx", file=sys.stderr)
+
+
+# Threads para refinamento paralelo das regiões (OpenCV e zbar liberam o GIL)
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+
+
+# Ordem de tentativa das versões de PDI no refinamento de cada região
+REFINE_ORDER = ('binary', 'sharpened', 'enhanced')
+
+# Localizador rápido (gradiente de Scharr + morfologia em resolução reduzida)
+LOCALIZER_SCALE = 0.5           # Escala do frame analisado
+LOCALIZER_MIN_CONTRAST = 35.0   # Contraste local mínimo (níveis de cinza)
+LOCALIZER_MAX_CANDIDATES = 8    # Mesmo limite de códigos da interface
+LOCALIZER_LINEAR_COHERENCE = 0.7  # Acima disso o candidato é tratado como 1D
+
+# Pirâmide (coarse-to-fine): imagens menores que isso vão direto à resolução total
+PYRAMID_MIN_SIDE = 80
+
+# DataMatrix (pylibdmtx): limite rígido por chamada e busca restrita a candidatos
+DMTX_TIMEOUT_MS = 60        # Tempo máximo de cada chamada ao libdmtx
+DMTX_MAX_CANDIDATES = 4     # Regiões candidatas por frame
+DMTX_MAX_SIDE = 400         # Recortes maiores são reduzidos antes da busca
+DMTX_REANCHOR_MARGIN = 0.5  # Busca do resultado assíncrono atrasado (fração do bbox)
+DMTX_REANCHOR_MIN_SCORE = 0.6  # Correlação mínima para reposicioná-lo (senão descarta)
+
+# Cache de resultados por região retificada (hash perceptual)
+RESULT_CACHE_ENTRIES = 64               # Máximo de regiões memorizadas
+RESULT_CACHE_BYTES = 32 * 1024 * 1024   # Máximo de memória (imagens guardadas)
+RESULT_CACHE_MAX_DISTANCE = 6           # Bits diferentes (de 256) ainda aceitos
+
+# Fallback no frame completo: só com indício de código e no máximo a cada N ms
+FALLBACK_LIKELIHOOD_SCALE = 0.25    # Escala do frame usado no indício
+FALLBACK_MIN_LIKELIHOOD = 0.003     # Fração mínima do frame com textura de código
+FALLBACK_MIN_CONTRAST = 12.0        # Contraste do indício (< localizador: pega código apagado)
+FALLBACK_INTERVAL_MS = 500          # Intervalo mínimo entre dois fallbacks
+
+# Amostras guardadas por etapa no StageTimer (buffer circular)
+STAGE_SAMPLES = 1000
+# Limites (ms) das faixas do histograma exportado; a última faixa é aberta
+STAGE_HISTOGRAM_EDGES_MS = (0.5, 1, 2, 5, 10, 20, 33, 50, 100, 200, 500)
+
+# Prazo por frame (um período de frame a 30 fps)
+DEFAULT_DEADLINE_MS = 1000.0 / 30
+DEADLINE_MAX_STAGE_CUTS = 5     # Cortes seguidos de uma etapa antes de ela rodar mesmo assim
+DEADLINE_COST_DECAY = 0.9       # Fator aplicado à estimativa de uma etapa a cada corte
+
+# Filtro de movimento antes do detector (frame reduzido em escala de cinza)
+MOTION_THUMB_WIDTH = 96         # Largura da miniatura comparada
+MOTION_PIXEL_DELTA = 12         # Diferença (níveis de cinza) que conta como mudança
+MOTION_CHANGED_FRACTION = 0.004  # Fração de pixels mudados que dispara a detecção
+MOTION_MAX_STATIC_MS = 1000     # Revalida o resultado mesmo com a cena parada
+
+# Ponto compatível com pyzbar.locations.Point (usado em 'points'/'polygon')
+Point = namedtuple('Point', 'x y')
+
+
+# ==================== SCANNER ZBAR PERSISTENTE ====================
+class ZbarScanner:
+    """zbar_image_scanner reutilizável, configurado uma vez com as simbologias
+
+    Não é thread-safe: use uma instância por thread.
+
+    Os WARNINGs de asserção do decodificador DataBar são impressos pelo zbar
+    direto no stderr do processo (a verbosidade não os controla, e redirecionar
+    o descritor 2 afetaria todas as threads). A forma efetiva de evitá-los é
+    não habilitar DataBar na lista de simbologias do modelo.
+    """
+
+    def __init__(self, symbologies: Iterable[str] = ()):
+        self.symbols = [pyzbar.ZBarSymbol[name] for name in symbologies
+                        if name in pyzbar.ZBarSymbol.__members__]
+
+        # Lista definida mas sem nenhuma simbologia do zbar → zbar desligado
+        self.enabled = not symbologies or bool(self.symbols)
+        self._scanner = None
+
+        if ZBAR_NATIVE_AVAILABLE and self.enabled:
+            self._scanner = zbar_image_scanner_create()
+            if self.symbols:
+                # Desabilita tudo e habilita só as simbologias do modelo
+                for symbol in set(pyzbar.ZBarSymbol).difference(self.symbols):
+                    zbar_image_scanner_set_config(self._scanner, symbol, ZBarConfig.CFG_ENABLE, 0)
+                for symbol in self.symbols:
+                    zbar_image_scanner_set_config(self._scanner, symbol, ZBarConfig.CFG_ENABLE, 1)
+
+    def decode(self, image: np.ndarray) -> list:
+        """Equivalente a pyzbar.decode(image), reutilizando o scanner"""
+        if not self.enabled:
+            return []
+        if not self._scanner:
+            return pyzbar.decode(image, symbols=self.symbols or None)
+
+        pixels, width, height = _pixel_data(image)
+        with _image() as img:
+            zbar_image_set_format(img, _FOURCC['L800'])
+            zbar_image_set_size(img, width, height)
+            zbar_image_set_data(img, cast(pixels, c_void_p), len(pixels), None)
+            if zbar_scan_image(self._scanner, img) < 0:
+                return []
+            return list(_decode_symbols(_symbols_for_image(img)))
+
+    def __del__(self):
+        if self._scanner:
+            zbar_image_scanner_destroy(self._scanner)
+            self._scanner = None
+
+
+# ==================== ESTATÍSTICAS DE ACERTO POR VERSÃO ====================
+class VariantStats:
+    """Aprende online qual versão de PDI decodifica cada simbologia
+
+    Para cada simbologia guarda tentativas/acertos por versão e ordena a
+    cascata pela taxa de acerto (suavizada). A cada `explore_every` decisões a
+    versão menos testada vai para o início (exploração), para que a ordem se
+    adapte se as condições da linha mudarem.
+    """
+
+    def __init__(self, explore_every: int = 20):
+        self.explore_every = explore_every
+        self.stats: Dict[str, Dict[str, List[int]]] = {}  # {simbologia: {versão: [tentativas, acertos]}}
+        self._decisions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def order(self, symbology: str, default_order: Tuple[str, ...],
+              cost: Optional[Callable[[str], float]] = None) -> Tuple[str, ...]:
+        """Ordem de tentativa das versões para a simbologia
+
+        Com `cost` (ms esperados por versão) a ordem é por acerto por ms.
+        """
+        with self._lock:
+            table = self.stats.get(symbology, {})
+            count = self._decisions.get(symbology, 0) + 1
+            self._decisions[symbology] = count
+
+            def score(name):
+                tries, hits = table.get(name, (0, 0))
+                rate = (hits + 1) / (tries + 2)
+                return rate / max(cost(name), 0.1) if cost is not None else rate
+
+            ranked = sorted(default_order, key=lambda name: (-score(name), default_order.index(name)))
+
+            # ✅ EXPLORAÇÃO periódica: testa primeiro a versão menos usada
+            if self.explore_every > 0 and count % self.explore_every == 0:
+                least_tried = min(ranked[1:], key=lambda name: table.get(name, (0, 0))[0], default=None)
+                if least_tried is not None:
+                    ranked.remove(least_tried)
+                    ranked.insert(0, least_tried)
+
+            return tuple(ranked)
+
+    def hit_rate(self, symbology: str, variant: str) -> float:
+        """Taxa de acerto suavizada da versão para a simbologia"""
+        with self._lock:
+            tries, hits = self.stats.get(symbology, {}).get(variant, (0, 0))
+            return (hits + 1) / (tries + 2)
+
+    def record(self, symbology: str, variant: str, hit: bool):
+        """Registra uma tentativa de decodificação"""
+        with self._lock:
+            entry = self.stats.setdefault(symbology, {}).setdefault(variant, [0, 0])
+            entry[0] += 1
+            if hit:
+                entry[1] += 1
+
+    def to_dict(self) -> Dict:
+        """Serializa para salvar junto ao modeloN.json"""
+        with self._lock:
+            return {sym: {name: list(v) for name, v in table.items()}
+                    for sym, table in self.stats.items()}
+
+    def load_dict(self, data: Dict):
+        """Restaura estatísticas salvas (substitui as atuais)"""
+        with self._lock:
+            self.stats = {str(sym): {str(name): [int(v[0]), int(v[1])] for name, v in table.items()}
+                          for sym, table in (data or {}).items()}
+            self._decisions.clear()
+
+
+# ==================== TEMPOS POR ETAPA ====================
+class StageTimer:
+    """Tempos por etapa (ms) em buffers circulares, com percentis
+
+    Usa time.perf_counter() (monotônico). Seguro entre threads: cada
+    amostra é anexada sob lock a um deque de tamanho fixo por etapa.
+    """
+
+    def __init__(self, maxlen: int = STAGE_SAMPLES):
+        self.maxlen = maxlen
+        self.samples: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, elapsed_ms: float):
+        with self._lock:
+            samples = self.samples.get(stage)
+            if samples is None:
+                samples = self.samples[stage] = deque(maxlen=self.maxlen)
+            samples.append(elapsed_ms)
+
+    @contextmanager
+    def measure(self, stage: str):
+        """with timer.measure('etapa'): ... registra a duração do bloco"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, (time.perf_counter() - start) * 1000.0)
+
+    def values(self, stage: str) -> List[float]:
+        with self._lock:
+            return list(self.samples.get(stage, ()))
+
+    def reset(self):
+        with self._lock:
+            self.samples.clear()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Por etapa: calls, mean_ms, p50_ms, p95_ms, p99_ms, max_ms"""
+        with self._lock:
+            snapshot = {stage: list(samples) for stage, samples in self.samples.items()}
+        summary = {}
+        for stage, values in snapshot.items():
+            if not values:
+                continue
+            p50, p95, p99 = np.percentile(values, (50, 95, 99))
+            summary[stage] = {
+                'calls': len(values),
+                'mean_ms': float(np.mean(values)),
+                'p50_ms': float(p50),
+                'p95_ms': float(p95),
+                'p99_ms': float(p99),
+                'max_ms': float(max(values)),
+            }
+        return summary
+
+    def histograms(self, edges_ms: Sequence[float] = STAGE_HISTOGRAM_EDGES_MS) -> Dict[str, Dict]:
+        """Por etapa: contagem das amostras do buffer em cada faixa de tempo
+
+        'edges_ms' tem um limite a mais que 'counts' (0 ... último limite,
+        e a última faixa vai até infinito).
+        """
+        with self._lock:
+            snapshot = {stage: list(samples) for stage, samples in self.samples.items()}
+        bins = [0.0, *edges_ms, np.inf]
+        histograms = {}
+        for stage, values in snapshot.items():
+            counts, _ = np.histogram(values, bins=bins)
+            histograms[stage] = {'edges_ms': [0.0, *map(float, edges_ms)], 'counts': counts.tolist()}
+        return histograms
+
+    def export(self) -> Dict[str, Dict]:
+        """Resumo e histograma de cada etapa, pronto para json.dump"""
+        summary = self.summary()
+        return {stage: {**summary[stage], 'histogram': histogram}
+                for stage, histogram in self.histograms().items() if stage in summary}
+
+
+# ==================== ORÇAMENTO DE TEMPO POR FRAME ====================
+class FrameScheduler:
+    """Prazo por frame para o pipeline de decodificação
+
+    Cada etapa cortável (versão de PDI no refinamento, DataMatrix, fallback)
+    pergunta allows() antes de rodar: se o custo esperado (média móvel por
+    megapixel, medida em measure()) não cabe no tempo restante, a etapa é
+    cortada e contabilizada. Regiões cujo refinamento foi cortado são
+    adiadas para o próximo frame, onde têm prioridade e retomam das versões
+    que faltaram. O primeiro item de cada frame sempre roda (garante
+    progresso mesmo com prazo curto demais).
+
+    Etapas que não cabem nunca no prazo (ex: fallback no frame completo)
+    não podem ficar desligadas: depois de `max_stage_cuts` cortes seguidos
+    a etapa roda mesmo assim. A estimativa só é medida quando a etapa roda,
+    então cada corte a reduz (`cost_decay`), e a primeira amostra (com o
+    custo de aquecimento) é substituída pela segunda em vez de entrar na média.
+    """
+
+    def __init__(self, deadline_ms: float = DEFAULT_DEADLINE_MS, alpha: float = 0.2,
+                 max_deferred_frames: int = 3, max_stage_cuts: int = DEADLINE_MAX_STAGE_CUTS,
+                 cost_decay: float = DEADLINE_COST_DECAY):
+        self.deadline_ms = deadline_ms
+        self.alpha = alpha
+        self.max_deferred_frames = max_deferred_frames
+        self.max_stage_cuts = max_stage_cuts
+        self.cost_decay = cost_decay
+        self._cost: Dict[str, float] = {}   # etapa → ms (por megapixel, se medido com pixels)
+        self._samples: Dict[str, int] = {}  # etapa → nº de medidas
+        self._stage_cuts: Dict[str, int] = {}   # etapa → cortes seguidos
+        self._lock = threading.Lock()
+        self._start = 0.0
+        self._items_run = 0
+        self._frame_cut = False
+        self._deferred: List[Dict] = []
+
+        # Estatísticas
+        self.frames = 0
+        self.deadline_hits = 0      # Frames concluídos dentro do prazo
+        self.frames_cut = 0         # Frames com pelo menos uma etapa cortada
+        self.cuts: Dict[str, int] = {}
+        self.forced: Dict[str, int] = {}    # Execuções forçadas após cortes seguidos
+
+    def begin(self):
+        """Início de um frame"""
+        with self._lock:
+            self._start = time.perf_counter()
+            self._items_run = 0
+            self._frame_cut = False
+
+    def end(self):
+        """Fim de um frame: contabiliza o prazo"""
+        elapsed = self.elapsed_ms()
+        with self._lock:
+            self.frames += 1
+            if elapsed <= self.deadline_ms:
+                self.deadline_hits += 1
+            if self._frame_cut:
+                self.frames_cut += 1
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._start) * 1000.0
+
+    def remaining_ms(self) -> float:
+        return self.deadline_ms - self.elapsed_ms()
+
+    def expected_ms(self, stage: str, pixels: Optional[int] = None) -> float:
+        """Custo esperado da etapa (0 enquanto não houver medida)"""
+        cost = self._cost.get(stage, 0.0)
+        return cost * pixels / 1e6 if pixels else cost
+
+    def measure(self, stage: str, elapsed_ms: float, pixels: Optional[int] = None):
+        """Atualiza a média móvel do custo da etapa"""
+        value = elapsed_ms * 1e6 / pixels if pixels else elapsed_ms
+        with self._lock:
+            samples = self._samples.get(stage, 0)
+            self._samples[stage] = samples + 1
+            if samples <= 1:
+                # 1ª amostra: alocações e caches frios; a 2ª a substitui
+                self._cost[stage] = value
+            else:
+                previous = self._cost[stage]
+                self._cost[stage] = previous + self.alpha * (value - previous)
+
+    def allows(self, stage: str, pixels: Optional[int] = None) -> bool:
+        """True se a etapa cabe no tempo restante (senão registra o corte)"""
+        expected = self.expected_ms(stage, pixels)
+        with self._lock:
+            starved = self._stage_cuts.get(stage, 0) >= self.max_stage_cuts
+            if self._items_run == 0 or starved or expected <= self.deadline_ms - self.elapsed_ms():
+                if starved and self._items_run > 0:
+                    self.forced[stage] = self.forced.get(stage, 0) + 1
+                self._items_run += 1
+                self._stage_cuts[stage] = 0
+                return True
+            self._stage_cuts[stage] = self._stage_cuts.get(stage, 0) + 1
+            if stage in self._cost:
+                self._cost[stage] *= self.cost_decay
+            self._frame_cut = True
+            self.cuts[stage] = self.cuts.get(stage, 0) + 1
+            return False
+
+    def defer(self, region: Dict):
+        """Adia uma região não concluída para o próximo frame"""
+        age = region.get('deferred_frames', 0) + 1
+        if age > self.max_deferred_frames:
+            return
+        with self._lock:
+            self._deferred.append(dict(region, deferred_frames=age))
+
+    def take_deferred(self) -> List[Dict]:
+        """Regiões adiadas pelo frame anterior (esvazia a lista)"""
+        with self._lock:
+            deferred, self._deferred = self._deferred, []
+            return deferred
+
+    def stats(self) -> Dict:
+        """Frequência de prazo cumprido e etapas cortadas"""
+        with self._lock:
+            return {
+                'frames': self.frames,
+                'deadline_hit_rate': self.deadline_hits / self.frames if self.frames else 0.0,
+                'frames_cut': self.frames_cut,
+                'cuts': dict(self.cuts),
+                'forced': dict(self.forced),
+                'deferred': len(self._deferred),
+            }
+
+
+# ==================== VERSÕES DE PDI (SOB DEMANDA) ====================
+class RegionVariants:
+    """Versões de PDI de uma região retificada, calculadas apenas quando usadas
+
+    Dependências: enhanced → gray → binary / sharpened
+    Com `timer`, cada versão registra só o próprio custo (etapas 'clahe',
+    'gray', 'threshold', 'sharpen'), sem contar as dependências.
+    """
+
+    def __init__(self, rectified: np.ndarray, timer: Optional['StageTimer'] = None):
+        self.rectified = rectified
+        self.timer = timer
+
+    @classmethod
+    def precomputed(cls, rectified: np.ndarray, **versions: np.ndarray) -> 'RegionVariants':
+        """Versões já calculadas em outro lugar (ex: recortes do PDI do frame completo)"""
+        variants = cls(rectified)
+        variants.__dict__.update(versions)
+        return variants
+
+    def snapshot(self, copy: bool = False, timer: Optional['StageTimer'] = None) -> 'RegionVariants':
+        """Novo objeto com as versões já calculadas, independente deste
+
+        copy=True copia os arrays e os marca como somente leitura (entrada do
+        cache); sem cópia, os arrays são compartilhados. Versões calculadas
+        depois em um objeto não aparecem no outro.
+        """
+        arrays = {name: value for name, value in self.__dict__.items() if isinstance(value, np.ndarray)}
+        if copy:
+            arrays = {name: value.copy() for name, value in arrays.items()}
+            for value in arrays.values():
+                value.flags.writeable = False
+        variants = RegionVariants.precomputed(**arrays)
+        variants.timer = timer
+        return variants
+
+    def _measure(self, stage: str):
+        return self.timer.measure(stage) if self.timer is not None else nullcontext()
+
+    def get(self, name: str) -> np.ndarray:
+        """Retorna a versão pelo nome ('enhanced', 'gray', 'binary', 'sharpened')"""
+        return getattr(self, name)
+
+    def built(self, name: str) -> Optional[np.ndarray]:
+        """Retorna a versão somente se já foi calculada (sem calcular)"""
+        return self.__dict__.get(name)
+
+    @cached_property
+    def enhanced(self) -> np.ndarray:
+        # 4.1: CLAHE (equalização adaptativa)
+        with self._measure('clahe'):
+            clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+            lab = cv2.cvtColor(self.rectified, cv2.COLOR_BGR2LAB)
+            lab[:, :, 0] = clahe.apply(lab[:, :, 0])
+            return cv2.cvtColor(lab, cv2.COLOR_LAB2BGR)
+
+    @cached_property
+    def gray(self) -> np.ndarray:
+        # 4.2: Escala de cinza
+        enhanced = self.enhanced
+        with self._measure('gray'):
+            return cv2.cvtColor(enhanced, cv2.COLOR_BGR2GRAY)
+
+    @cached_property
+    def binary(self) -> np.ndarray:
+        # 4.3: Binarização adaptativa (CRÍTICO para códigos 1D)
+        gray = self.gray
+        with self._measure('threshold'):
+            binary = cv2.adaptiveThreshold(
+                gray, 255,
+                cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                cv2.THRESH_BINARY,
+                blockSize=11,
+                C=2
+            )
+
+            # 4.4: Remoção de ruído
+            kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+            return cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel, iterations=1)
+
+    @cached_property
+    def sharpened(self) -> np.ndarray:
+        # 4.5: Sharpening (aguça bordas para melhor leitura)
+        # Usa filtro Unsharp Mask
+        gray = self.gray
+        with self._measure('sharpen'):
+            gaussian = cv2.GaussianBlur(gray, (0, 0), 2.0)
+            return cv2.addWeighted(gray, 1.5, gaussian, -0.5, 0)
+
+
+# Imagem da região de um código por modo de miniatura → versão em RegionVariants
+CODE_VARIANTS = {
+    'original': 'rectified',    # Retificada, sem PDI
+    'enhanced': 'enhanced',     # Com CLAHE
+    'gray': 'sharpened',        # Escala de cinza aguçada
+    'binary': 'binary',         # Binarizada
+}
+
+
+def code_variant(code: Dict, name: str) -> Optional[np.ndarray]:
+    """Imagem da região de um código ('original', 'enhanced', 'gray', 'binary')
+
+    Os códigos carregam só a referência às versões ('variants'); a versão
+    pedida é calculada aqui, na primeira vez, e as demais nunca são.
+    """
+    variants = code.get('variants')
+    if variants is None:
+        return None
+    return variants.get(CODE_VARIANTS[name])
+
+
+# ==================== CACHE DE RESULTADOS ====================
+def perceptual_hash(image: np.ndarray) -> np.ndarray:
+    """dHash de 256 bits: compara vizinhos horizontais em 16x17 (INTER_AREA)
+
+    Insensível a ruído de sensor e pequenas variações de brilho; muda
+    quando o conteúdo (o código) muda.
+    """
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(image, (17, 16), interpolation=cv2.INTER_AREA).astype(np.int16)
+    return np.packbits(small[:, 1:] > small[:, :-1])
+
+
+class DecodeCache:
+    """LRU de resultados de refinamento indexado pelo hash da região retificada
+
+    Com a peça parada, a mesma região chega idêntica (a menos de ruído) a
+    cada frame: o resultado anterior e as versões de PDI já calculadas são
+    reaproveitados sem CLAHE, binarização nem zbar. Falhas também são
+    memorizadas (resultado None). `group` separa entradas que não podem se
+    misturar (simbologia, configuração do decodificador). Limitado por
+    número de entradas e bytes.
+
+    O cache guarda uma cópia somente leitura das versões (tamanho fixo) e
+    cada acerto recebe um RegionVariants próprio: versões calculadas depois
+    (miniaturas) ficam no objeto do frame, não crescem nem são compartilhadas
+    pela entrada do cache entre threads.
+    """
+
+    def __init__(self, max_entries: int = RESULT_CACHE_ENTRIES,
+                 max_bytes: int = RESULT_CACHE_BYTES,
+                 max_distance: int = RESULT_CACHE_MAX_DISTANCE):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_distance = max_distance
+        self._entries: OrderedDict = OrderedDict()  # chave → (hash, resultado, variants, bytes)
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _size(result: Optional[Dict], variants: 'RegionVariants') -> int:
+        return sum(v.nbytes for v in variants.__dict__.values() if isinstance(v, np.ndarray))
+
+    def get(self, group: Hashable, phash: np.ndarray, timer: Optional['StageTimer'] = None):
+        """Retorna (resultado, variants) memorizados ou None (variants novo a cada acerto)"""
+        key = (group, phash.tobytes())
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self.max_distance > 0:
+                # Tolerância a ruído: menor distância de Hamming no mesmo grupo
+                best = self.max_distance + 1
+                for other_key, other in self._entries.items():
+                    if other_key[0] != group:
+                        continue
+                    distance = int(np.unpackbits(other[0] ^ phash).sum())
+                    if distance < best:
+                        best, key, entry = distance, other_key, other
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return entry[1], entry[2].snapshot(timer=timer)
+
+    def put(self, group: Hashable, phash: np.ndarray, result: Optional[Dict], variants: 'RegionVariants'):
+        """Memoriza um resultado (descarta os menos usados além dos limites)"""
+        variants = variants.snapshot(copy=True)
+        if result is not None:
+            result = dict(result, variants=variants)
+        size = self._size(result, variants)
+        if size > self.max_bytes:
+            return
+        key = (group, phash.tobytes())
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[3]
+            self._entries[key] = (phash, result, variants, size)
+            self.total_bytes += size
+            while self._entries and (len(self._entries) > self.max_entries
+                                     or self.total_bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self.total_bytes -= evicted[3]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        """Contadores de acerto/falha e ocupação"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'bytes': self.total_bytes,
+            }
+
+
+# ==================== LOCALIZADOR RÁPIDO ====================
+def localize_codes(gray: np.ndarray, scale: float = LOCALIZER_SCALE,
+                   min_contrast: float = LOCALIZER_MIN_CONTRAST,
+                   max_candidates: int = LOCALIZER_MAX_CANDIDATES) -> List[Dict]:
+    """Propõe ROIs candidatas a códigos sem chamar nenhum decodificador
+
+    1. Gradiente de Scharr no frame reduzido
+    2. Tensor de estrutura (Jxx, Jyy, Jxy) suavizado:
+       • energia → contraste local (códigos são muito texturizados)
+       • coerência → anisotropia (≈1 para barras 1D, baixa para QR/DataMatrix)
+    3. Limiar de contraste + fechamento/abertura morfológica
+    4. Contornos → retângulo de área mínima (aceita códigos girados)
+
+    Retorna dicts com 'bbox' (x, y, w, h), 'polygon' (4 Points), 'kind'
+    ('linear' ou 'matrix') e 'score', em coordenadas do frame, ordenados por score.
+    """
+    small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    gx = cv2.Scharr(small, cv2.CV_32F, 1, 0)
+    gy = cv2.Scharr(small, cv2.CV_32F, 0, 1)
+
+    window = (9, 9)
+    jxx = cv2.blur(gx * gx, window)
+    jyy = cv2.blur(gy * gy, window)
+    jxy = cv2.blur(gx * gy, window)
+    energy = jxx + jyy
+
+    contrast = np.sqrt(energy) / 16.0  # Scharr tem ganho 16
+    coherence = np.sqrt((jxx - jyy) ** 2 + 4 * jxy * jxy) / (energy + 1e-6)
+
+    mask = (contrast > min_contrast).astype(np.uint8) * 255
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (11, 11)))
+    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5)))
+
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    height, width = gray.shape[:2]
+    candidates = []
+    for contour in contours:
+        rect = cv2.minAreaRect(contour)
+        (_, _), (rw, rh), _ = rect
+        if min(rw, rh) < 10 or rw * rh < 300:
+            continue
+
+        x, y, w, h = cv2.boundingRect(contour)
+        contour_mask = np.zeros((h, w), np.uint8)
+        cv2.drawContours(contour_mask, [contour - (x, y)], -1, 255, -1)
+        score = cv2.mean(contrast[y:y+h, x:x+w], contour_mask)[0]
+        mean_coherence = cv2.mean(coherence[y:y+h, x:x+w], contour_mask)[0]
+
+        box = cv2.boxPoints(rect) / scale
+        x1 = max(0, int(x / scale))
+        y1 = max(0, int(y / scale))
+        x2 = min(width, int((x + w) / scale))
+        y2 = min(height, int((y + h) / scale))
+        candidates.append({
+            'bbox': (x1, y1, x2 - x1, y2 - y1),
+            'polygon': [Point(int(px), int(py)) for px, py in box],
+            'kind': 'linear' if mean_coherence > LOCALIZER_LINEAR_COHERENCE else 'matrix',
+            'score': score,
+        })
+
+    candidates.sort(key=lambda c: -c['score'])
+    return candidates[:max_candidates]
+
+
+def code_likelihood(gray: np.ndarray, scale: float = FALLBACK_LIKELIHOOD_SCALE,
+                    min_contrast: float = FALLBACK_MIN_CONTRAST) -> float:
+    """Indício barato de código no frame: fração da área com contraste local alto
+
+    Mesmo critério do localizador, em resolução bem menor e com limiar de
+    contraste mais baixo: o fallback existe justamente para os códigos
+    apagados que o localizador perde. Uma estação vazia (fundo liso) fica
+    perto de 0.
+    """
+    small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    gx = cv2.Scharr(small, cv2.CV_32F, 1, 0)
+    gy = cv2.Scharr(small, cv2.CV_32F, 0, 1)
+    energy = cv2.blur(gx * gx + gy * gy, (5, 5))
+    contrast = np.sqrt(energy) / 16.0  # Scharr tem ganho 16
+    return float(np.count_nonzero(contrast > min_contrast)) / contrast.size
+
+
+def _rescale_decoded(obj, factor: float):
+    """Converte rect/polygon de um resultado pyzbar por um fator de escala"""
+    left, top, width, height = obj.rect
+    rect = type(obj.rect)(int(left * factor), int(top * factor),
+                          int(width * factor), int(height * factor))
+    polygon = [type(p)(int(p.x * factor), int(p.y * factor)) for p in obj.polygon]
+    return obj._replace(rect=rect, polygon=polygon)
+
+
+def _translate_decoded(obj, dx: int, dy: int):
+    """Desloca rect/polygon de um resultado pyzbar (recorte → imagem inteira)"""
+    left, top, width, height = obj.rect
+    rect = type(obj.rect)(left + dx, top + dy, width, height)
+    polygon = [type(p)(p.x + dx, p.y + dy) for p in obj.polygon]
+    return obj._replace(rect=rect, polygon=polygon)
+
+
+def _expand_bbox(bbox: tuple, margin: float, shape: tuple) -> tuple:
+    """Expande (x, y, w, h) pela fração `margin`, limitado ao frame"""
+    x, y, w, h = bbox
+    mx, my = int(w * margin), int(h * margin)
+    x1, y1 = max(0, x - mx), max(0, y - my)
+    x2, y2 = min(shape[1], x + w + mx), min(shape[0], y + h + my)
+    return x1, y1, x2 - x1, y2 - y1
+
+
+# ==================== DATAMATRIX (PYLIBDMTX) ====================
+def _reanchor_code(code: Dict, gray: np.ndarray) -> Optional[Dict]:
+    """Reposiciona um código de um frame antigo procurando seu recorte no atual
+
+    Busca por correlação só em volta do bbox original (margem
+    DMTX_REANCHOR_MARGIN). Retorna None se o código não foi reencontrado.
+    """
+    template = cv2.cvtColor(code['variants'].rectified, cv2.COLOR_BGR2GRAY)
+    th, tw = template.shape[:2]
+    sx, sy, sw, sh = _expand_bbox(code['bbox'], DMTX_REANCHOR_MARGIN, gray.shape)
+    if th < 4 or tw < 4 or sw < tw or sh < th:
+        return None
+    scores = cv2.matchTemplate(gray[sy:sy+sh, sx:sx+sw], template, cv2.TM_CCOEFF_NORMED)
+    _, score, _, (mx, my) = cv2.minMaxLoc(scores)
+    if not score >= DMTX_REANCHOR_MIN_SCORE:   # NaN (recorte liso) também descarta
+        return None
+    x, y, w, h = code['bbox']
+    dx, dy = sx + mx - x, sy + my - y
+    return dict(code, bbox=(x + dx, y + dy, w, h),
+                points=[Point(px + dx, py + dy) for px, py in code['points']])
+
+
+def _overlaps(a: tuple, b: tuple) -> bool:
+    """True se o centro de uma bbox (x, y, w, h) cai dentro da outra"""
+    def center_inside(inner, outer):
+        cx = inner[0] + inner[2] / 2
+        cy = inner[1] + inner[3] / 2
+        return outer[0] <= cx <= outer[0] + outer[2] and outer[1] <= cy <= outer[1] + outer[3]
+    return center_inside(a, b) or center_inside(b, a)
+
+
+def decode_dmtx_crop(crop: np.ndarray, timeout_ms: int = DMTX_TIMEOUT_MS,
+                     shrink: int = 1, max_side: int = DMTX_MAX_SIDE) -> list:
+    """pylibdmtx.decode em um recorte com timeout e redução opcional
+
+    Retorna [(data, (x, y, w, h))] em coordenadas do recorte (origem no topo).
+    """
+    if not PYLIBDMTX_AVAILABLE or crop.size == 0:
+        return []
+
+    gray = crop if crop.ndim == 2 else cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+
+    # ✅ Reduz recortes grandes: a busca do libdmtx cresce com a área
+    factor = 1.0
+    if max(gray.shape[:2]) > max_side:
+        factor = max_side / max(gray.shape[:2])
+        gray = cv2.resize(gray, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+
+    try:
+        decoded = pylibdmtx.decode(gray, timeout=timeout_ms, shrink=shrink, max_count=1)
+    except Exception:
+        return []
+
+    results = []
+    height = gray.shape[0]
+    for obj in decoded:
+        # libdmtx usa origem no canto INFERIOR esquerdo
+        left, bottom, w, h = obj.rect
+        xs = sorted((left, left + w))
+        ys = sorted((height - bottom, height - (bottom + h)))
+        bbox = (int(xs[0] / factor), int(ys[0] / factor),
+                int((xs[1] - xs[0]) / factor), int((ys[1] - ys[0]) / factor))
+        results.append((obj.data.decode('utf-8', errors='ignore'), bbox))
+    return results
+
+
+class DmtxWorker:
+    """Executa buscas DataMatrix em uma thread própria (não bloqueia o frame)
+
+    submit() só aceita um lote se o anterior terminou; collect() devolve os
+    lotes prontos como (tag, resultados), inclusive os que não acharam nada.
+    Assim uma busca lenta do libdmtx atrasa no máximo o resultado DataMatrix,
+    nunca a visualização ao vivo.
+    """
+
+    def __init__(self, func: Callable[[list], List[Dict]]):
+        self.func = func
+        self._cond = threading.Condition()
+        self._jobs = None
+        self._tag = None
+        self._results: List[Tuple[object, List[Dict]]] = []
+        self._busy = False
+        self._thread = threading.Thread(target=self._loop, name="dmtx", daemon=True)
+        self._thread.start()
+
+    def submit(self, jobs: list, tag=None) -> bool:
+        """Agenda um lote de recortes; retorna False se ainda ocupado"""
+        with self._cond:
+            if self._busy:
+                return False
+            self._jobs = jobs
+            self._tag = tag
+            self._busy = True
+            self._cond.notify()
+            return True
+
+    @property
+    def busy(self) -> bool:
+        """True enquanto um lote está em andamento"""
+        with self._cond:
+            return self._busy
+
+    def collect(self) -> List[Tuple[object, List[Dict]]]:
+        """Retorna (e limpa) os lotes já concluídos, como (tag, resultados)"""
+        with self._cond:
+            results, self._results = self._results, []
+            return results
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while self._jobs is None:
+                    self._cond.wait()
+                jobs, self._jobs = self._jobs, None
+                tag = self._tag
+            try:
+                results = self.func(jobs)
+            except Exception as e:
+                print(f"⚠️ Erro na busca DataMatrix: {e}", file=sys.stderr)
+                results = []
+            with self._cond:
+                self._results.append((tag, results))
+                self._busy = False
+
+
+# ==================== FILTRO DE MOVIMENTO ====================
+class MotionGate:
+    """Decide se um frame precisa passar pelo detector
+
+    • 'duplicate': frame byte a byte igual ao anterior (algumas câmeras UVC
+      reenviam o mesmo buffer)
+    • 'static': cena igual à do último frame detectado (miniatura em cinza)
+      e o último resultado ainda é recente
+    • 'changed': algo mudou → detectar
+
+    A referência é a miniatura do último frame DETECTADO, então uma deriva
+    lenta acumula e acaba disparando a detecção.
+    """
+
+    def __init__(self, thumb_width: int = MOTION_THUMB_WIDTH,
+                 pixel_delta: int = MOTION_PIXEL_DELTA,
+                 changed_fraction: float = MOTION_CHANGED_FRACTION,
+                 max_static_ms: float = MOTION_MAX_STATIC_MS):
+        self.thumb_width = thumb_width
+        self.pixel_delta = pixel_delta
+        self.changed_fraction = changed_fraction
+        self.max_static_ms = max_static_ms
+        self._last_frame: Optional[np.ndarray] = None
+        self._reference: Optional[np.ndarray] = None
+        self._reference_time = 0.0
+
+        # Estatísticas
+        self.duplicates = 0
+        self.static_skips = 0
+
+    def invalidate(self):
+        """Força detecção no próximo frame (ex: parâmetros alterados)"""
+        self._reference = None
+
+    def _thumbnail(self, frame: np.ndarray) -> np.ndarray:
+        height, width = frame.shape[:2]
+        size = (self.thumb_width, max(1, round(height * self.thumb_width / width)))
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+    def check(self, frame: np.ndarray) -> str:
+        """Classifica o frame: 'duplicate', 'static' ou 'changed'"""
+        last, self._last_frame = self._last_frame, frame
+        if last is not None and last.shape == frame.shape and np.array_equal(last, frame):
+            self.duplicates += 1
+            return 'duplicate'
+
+        thumb = self._thumbnail(frame)
+        now = time.monotonic()
+        reference = self._reference
+        if (reference is not None and reference.shape == thumb.shape
+                and (now - self._reference_time) * 1000.0 < self.max_static_ms):
+            changed = np.count_nonzero(cv2.absdiff(thumb, reference) > self.pixel_delta)
+            if changed <= self.changed_fraction * thumb.size:
+                self.static_skips += 1
+                return 'static'
+
+        self._reference = thumb
+        self._reference_time = now
+        return 'changed'
+
+
+# ==================== RASTREAMENTO ENTRE FRAMES ====================
+class CodeTracker:
+    """Acompanha o polígono de cada código decodificado entre frames
+
+    Enquanto a peça está parada na frente da câmera, o próximo frame só
+    precisa re-decodificar as regiões previstas. A previsão usa fluxo óptico
+    (Lucas-Kanade) em cantos dentro de cada código: o deslocamento mediano
+    move o polígono. Uma busca completa é feita a cada `full_search_every`
+    frames, quando não há trilhas, ou quando todas as trilhas se perdem.
+    """
+
+    def __init__(self, full_search_every: int = 15, max_misses: int = 3):
+        self.full_search_every = full_search_every
+        self.max_misses = max_misses
+        self.tracks: List[Dict] = []
+        self.prev_gray: Optional[np.ndarray] = None
+        self.frames_since_full = 0
+
+    def reset(self):
+        """Descarta todas as trilhas (força busca completa no próximo frame)"""
+        self.tracks = []
+        self.prev_gray = None
+        self.frames_since_full = 0
+
+    def needs_full_search(self, gray: np.ndarray) -> bool:
+        """True se o frame atual deve passar pelo pipeline completo"""
+        return (not self.tracks
+                or self.prev_gray is None
+                or self.prev_gray.shape != gray.shape
+                or self.frames_since_full >= self.full_search_every)
+
+    def predict(self, gray: np.ndarray) -> List[Dict]:
+        """Move as trilhas para o frame atual e retorna-as como regiões"""
+        height, width = gray.shape[:2]
+        regions = []
+        for track in self.tracks:
+            x, y, w, h = track['bbox']
+            points = cv2.goodFeaturesToTrack(self.prev_gray[y:y+h, x:x+w], 20, 0.01, 5)
+            if points is not None:
+                points = points.astype(np.float32) + np.float32([x, y])
+                moved, status, _ = cv2.calcOpticalFlowPyrLK(
+                    self.prev_gray, gray, points, None, winSize=(21, 21), maxLevel=3)
+                good = status.ravel() == 1
+                if good.sum() >= 3:
+                    shift = np.median((moved - points)[good].reshape(-1, 2), axis=0)
+                    track['polygon'] = track['polygon'] + shift
+
+            polygon = track['polygon']
+            x1, y1 = np.floor(polygon.min(axis=0)).astype(int)
+            x2, y2 = np.ceil(polygon.max(axis=0)).astype(int)
+            x1, y1 = max(0, x1), max(0, y1)
+            x2, y2 = min(width, x2), min(height, y2)
+            if x2 - x1 < 4 or y2 - y1 < 4:
+                track['misses'] = self.max_misses + 1  # Saiu do frame
+                continue
+            track['bbox'] = (int(x1), int(y1), int(x2 - x1), int(y2 - y1))
+
+            regions.append({
+                'type': track['type'],
+                'data': track['data'],
+                'bbox': track['bbox'],
+                'polygon': [Point(int(px), int(py)) for px, py in polygon],
+                'method': 'tracker',
+                'track': track
+            })
+
+        self.tracks = [t for t in self.tracks if t['misses'] <= self.max_misses]
+        return regions
+
+    def update_tracked(self, regions: List[Dict], results: List[Optional[Dict]], gray: np.ndarray):
+        """Atualiza as trilhas com o resultado da re-decodificação prevista"""
+        for region, result in zip(regions, results):
+            track = region['track']
+            if result is None:
+                track['misses'] += 1
+            else:
+                track['type'], track['data'] = result['type'], result['data']
+                track['misses'] = 0
+        self.tracks = [t for t in self.tracks if t['misses'] <= self.max_misses]
+        self.prev_gray = gray
+        self.frames_since_full += 1
+
+    def resolve(self, regions: List[Dict], found: set):
+        """Acerto/falha de trilhas re-decodificadas fora do frame (DataMatrix assíncrono)"""
+        for region in regions:
+            track = region['track']
+            track['misses'] = 0 if track['data'] in found else track['misses'] + 1
+        self.tracks = [t for t in self.tracks if t['misses'] <= self.max_misses]
+
+    def reset_from(self, codes: List[Dict], gray: np.ndarray):
+        """Recria as trilhas a partir do resultado de uma busca completa"""
+        self.tracks = []
+        self.add(codes)
+        self.prev_gray = gray
+        self.frames_since_full = 0
+
+    def add(self, codes: List[Dict]):
+        """Cria trilhas para códigos ainda não acompanhados (ex.: DataMatrix assíncrono)"""
+        tracked = {(t['type'], t['data']) for t in self.tracks}
+        for code in codes:
+            if (code['type'], code['data']) in tracked:
+                continue
+            points = np.float32([(p[0], p[1]) for p in code.get('points') or []])
+            if len(points) < 2:
+                continue
+            if len(points) != 4:
+                # 1D: zbar devolve o contorno das linhas de varredura
+                points = cv2.boxPoints(cv2.minAreaRect(points)).astype(np.float32)
+            x, y, w, h = code['bbox']
+            self.tracks.append({
+                'type': code['type'],
+                'data': code['data'],
+                'bbox': (int(x), int(y), int(w), int(h)),
+                'polygon': points,
+                'misses': 0
+            })
+            tracked.add((code['type'], code['data']))
+
+
+# ==================== MOTOR DE DETECÇÃO ====================
+class DetectionEngine:
+    """Pipeline de detecção de códigos independente de Qt e de câmera
+
+    PIPELINE OTIMIZADO:
+    1. Detecção inicial (localiza códigos)
+    2. Recorte da região detectada
+    3. Retificação de perspectiva (corrige inclinação)
+    4. PDI completo na região retificada
+    5. Re-detecção com maior precisão
+
+    As regiões da ETAPA 2 (e as 3 variantes do fallback) são processadas em
+    um pool de `workers` threads; workers=1 executa tudo em série.
+
+    No refinamento, as versões de PDI são tentadas em cascata e a busca para
+    na primeira que decodifica. thorough=True tenta todas e escolhe a
+    detecção de maior área (comportamento anterior).
+
+    Com adaptive=True a ordem da cascata é aprendida por simbologia
+    (VariantStats), partindo de REFINE_ORDER.
+
+    Com localizer=True a ETAPA 1 não decodifica o frame inteiro: um
+    localizador por gradiente propõe ROIs e o zbar só vê recortes pequenos.
+
+    Com pyramid_scale (ex: 0.5 ou 0.25) cada decodificação zbar é tentada
+    primeiro na imagem reduzida e só escala para a resolução total se falhar.
+
+    Com tracking=True (vídeo ao vivo) os códigos decodificados são
+    rastreados entre frames (CodeTracker) e, entre buscas completas, apenas
+    as regiões previstas são re-decodificadas.
+
+    Com result_cache=True o resultado do refinamento de cada região é
+    memorizado (DecodeCache) pelo hash perceptual da região retificada:
+    regiões que não mudaram não passam de novo pelo PDI nem pelo zbar.
+
+    O fallback no frame completo pode ser limitado (fallback_min_likelihood,
+    fallback_interval_ms): só roda se code_likelihood() indicar textura de
+    código e no máximo a cada N ms. Os padrões (0) mantêm o fallback sempre.
+
+    Com deadline_ms cada frame tem um prazo (FrameScheduler): regiões são
+    refinadas em ordem de acerto esperado por ms, e versões de PDI,
+    DataMatrix e fallback que não cabem no tempo restante são cortados;
+    regiões não concluídas passam ao próximo frame.
+
+    DataMatrix (pylibdmtx) roda só em regiões candidatas, com timeout por
+    chamada; com dmtx_async=True a busca vai para uma thread própria e o
+    resultado entra no primeiro scan() após terminar (reposicionado no frame
+    atual se o lote tiver mais de um frame).
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, thorough: bool = False,
+                 adaptive: bool = True, localizer: bool = True, pyramid_scale: float = 1.0,
+                 tracking: bool = False, result_cache: bool = False,
+                 fallback_min_likelihood: float = 0.0, fallback_interval_ms: float = 0.0,
+                 deadline_ms: Optional[float] = None, dmtx_async: bool = False,
+                 dmtx_timeout_ms: int = DMTX_TIMEOUT_MS, dmtx_shrink: int = 1):
+        # ✅ CACHE das versões processadas do último frame (usado pelas miniaturas)
+        self.enhanced_frame_cache: Optional[np.ndarray] = None
+        self.gray_frame_cache: Optional[np.ndarray] = None
+        self.binary_frame_cache: Optional[np.ndarray] = None
+
+        # Cascata com early-exit (False) ou tenta todas as versões (True)
+        self.thorough = thorough
+
+        # Ordem adaptativa das versões (estatísticas persistidas por modelo)
+        self.adaptive = adaptive
+        self.variant_stats = VariantStats()
+
+        # ✅ Scanner zbar persistente por thread + lista de simbologias do modelo
+        self.symbologies: Tuple[str, ...] = ()  # Vazio = todas
+        self._scanner_lock = threading.Lock()
+        self._scanner_version = 0
+        self._local = threading.local()
+
+        # Localizador rápido na ETAPA 1 (False = zbar no frame inteiro)
+        self.localizer = localizer
+
+        # Pirâmide coarse-to-fine (1.0 = desativada)
+        self.pyramid_scale = pyramid_scale
+
+        # Rastreamento entre frames (None = cada frame é independente)
+        self.tracker: Optional[CodeTracker] = CodeTracker() if tracking else None
+
+        # Cache de resultados por região retificada (None = desativado)
+        self.result_cache: Optional[DecodeCache] = DecodeCache() if result_cache else None
+
+        # Fallback no frame completo: indício mínimo e intervalo (0 = sempre)
+        self.fallback_min_likelihood = fallback_min_likelihood
+        self.fallback_interval_ms = fallback_interval_ms
+        self._last_fallback = float('-inf')
+        self.fallback_runs = 0
+        self.fallback_skipped = 0
+
+        # Prazo por frame (None = sem orçamento de tempo)
+        self.scheduler: Optional[FrameScheduler] = FrameScheduler(deadline_ms) if deadline_ms else None
+
+        # DataMatrix: limites de tempo/escala e worker opcional
+        self.dmtx_timeout_ms = dmtx_timeout_ms
+        self.dmtx_shrink = dmtx_shrink
+        self.dmtx_async = dmtx_async
+        self._dmtx_worker: Optional[DmtxWorker] = None
+        self._dmtx_pending_tracks: Dict[int, List[Dict]] = {}  # Lote → trilhas aguardando resultado
+        self._frame_seq = 0     # Nº do frame atual (idade dos resultados assíncronos)
+
+        # Tempos por etapa (localize, rectify, clahe, threshold, zbar, dmtx, ...)
+        self.stage_timer = StageTimer()
+
+        # Pool de threads (criado sob demanda)
+        self.workers = max(1, int(workers))
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def close(self):
+        """Encerra o pool de threads"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def deadline_stats(self) -> Dict:
+        """Prazo cumprido e etapas cortadas (vazio se sem prazo)"""
+        return self.scheduler.stats() if self.scheduler is not None else {}
+
+    def cache_stats(self) -> Dict[str, float]:
+        """Acertos/falhas do cache de resultados (vazio se desativado)"""
+        return self.result_cache.stats() if self.result_cache is not None else {}
+
+    def reset_tracking(self):
+        """Descarta as trilhas (ex: troca de peça ou de parâmetros)"""
+        if self.tracker is not None:
+            self.tracker.reset()
+
+    def latency_summary(self) -> Dict[str, Dict[str, float]]:
+        """Resumo da latência por chamada de cada decodificador (ms)"""
+        stages = self.stage_timer.summary()
+        return {name: stages[name] for name in ('zbar', 'dmtx') if name in stages}
+
+    def stage_summary(self) -> Dict[str, Dict[str, float]]:
+        """Latência de todas as etapas (calls, mean/p50/p95/p99/max em ms)"""
+        return self.stage_timer.summary()
+
+    def _map(self, func: Callable, items: list) -> list:
+        """map() no pool de threads preservando a ordem dos itens"""
+        if self.workers <= 1 or len(items) <= 1:
+            return [func(item) for item in items]
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                thread_name_prefix="refino")
+        return list(self._executor.map(func, items))
+
+    # ==================== API PÚBLICA ====================
+    def scan(self, frame: np.ndarray) -> List[Dict]:
+        """Detecta códigos 1D e 2D em um frame BGR"""
+        with self.stage_timer.measure('scan'):
+            if self.scheduler is None:
+                return self._scan_frame(frame)
+            self.scheduler.begin()
+            try:
+                return self._scan_frame(frame)
+            finally:
+                self.scheduler.end()
+
+    def _scan_frame(self, frame: np.ndarray) -> List[Dict]:
+        """Pipeline de um frame (ver scan)"""
+        self._frame_seq += 1
+        codes = []
+        processed_codes = set()  # Evita duplicatas
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+        # ============ RASTREAMENTO: só re-decodifica as regiões previstas ============
+        if self.tracker is not None and not self.tracker.needs_full_search(gray):
+            tracked_regions = self.tracker.predict(gray)
+            # DataMatrix não é lido pelo zbar: volta ao libdmtx no bbox previsto
+            dmtx_regions = [r for r in tracked_regions if r['type'] == 'DATAMATRIX']
+            tracked_regions = [r for r in tracked_regions if r['type'] != 'DATAMATRIX']
+            if self.scheduler is not None:
+                tracked_regions = self._schedule_regions(tracked_regions, keep_unmatched=False)
+            refined = self._map(lambda region: self.refine_region(frame, region), tracked_regions)
+            self._merge_refined(refined, codes, processed_codes)
+            results = [result for result, _ in refined]
+
+            # (acertos e falhas das trilhas DataMatrix: quando o lote termina)
+            dmtx_candidates = [{'bbox': r['bbox'], 'kind': 'matrix'} for r in dmtx_regions]
+            dmtx_codes = self._merge_datamatrix(frame, codes, processed_codes, gray,
+                                                dmtx_candidates, dmtx_regions)
+            self.tracker.update_tracked(tracked_regions, results, gray)
+            if dmtx_codes:
+                self.tracker.add(dmtx_codes)
+            # Assíncrono: trilhas DataMatrix vivas aguardam o lote, sem busca completa
+            if codes or (self.dmtx_async and dmtx_regions):
+                return codes
+            # Todas as trilhas falharam → busca completa neste mesmo frame
+
+        # ============ ETAPA 1: DETECÇÃO INICIAL (LOCALIZAÇÃO) ============
+        candidates = None
+        if self.localizer:
+            with self.stage_timer.measure('localize'):
+                candidates = localize_codes(gray)
+        detected_regions = self.locate_regions(frame, gray, candidates)
+        if self.scheduler is not None:
+            detected_regions = self._schedule_regions(detected_regions)
+
+        # ============ ETAPA 2: PROCESSAMENTO REFINADO DAS REGIÕES ============
+        # ✅ Regiões refinadas em paralelo; resultados mesclados na ordem original
+        refined = self._map(lambda region: self.refine_region(frame, region), detected_regions)
+        self._merge_refined(refined, codes, processed_codes)
+
+        # ============ DATAMATRIX: busca restrita a regiões candidatas ============
+        self._merge_datamatrix(frame, codes, processed_codes, gray, candidates)
+
+        # ============ FALLBACK: Se não detectou nada, tenta no frame completo ============
+        pixels = frame.shape[0] * frame.shape[1]
+        if len(codes) == 0 and self.should_run_fallback(gray, pixels):
+            start = time.perf_counter()
+            with self.stage_timer.measure('fallback'):
+                codes = self.scan_full_frame(frame)
+            self._stage_measure('fallback', start, pixels)
+
+        if self.tracker is not None:
+            self.tracker.reset_from(codes, gray)
+
+        return codes
+
+    def _merge_datamatrix(self, frame: np.ndarray, codes: List[Dict], processed_codes: set,
+                          gray: np.ndarray, candidates: Optional[List[Dict]],
+                          tracked: Optional[List[Dict]] = None) -> List[Dict]:
+        """Executa a etapa DataMatrix e adiciona os resultados sem duplicatas
+
+        Retorna os códigos DataMatrix obtidos. Mesmo com a busca adiada pelo
+        agendador, os resultados assíncronos já prontos são entregues.
+        """
+        if self._stage_allowed('datamatrix'):
+            start = time.perf_counter()
+            dmtx_codes = self.scan_datamatrix(frame, codes, gray, candidates, tracked)
+            self._stage_measure('datamatrix', start)
+        else:
+            dmtx_codes = self.collect_datamatrix(gray)
+        for dmtx_code in dmtx_codes:
+            code_key = f"{dmtx_code['type']}:{dmtx_code['data']}"
+            if code_key not in processed_codes:
+                processed_codes.add(code_key)
+                codes.append(dmtx_code)
+        return dmtx_codes
+
+    def _stage_allowed(self, stage: str, pixels: Optional[int] = None) -> bool:
+        return self.scheduler is None or self.scheduler.allows(stage, pixels)
+
+    def _stage_measure(self, stage: str, start: float, pixels: Optional[int] = None):
+        if self.scheduler is not None:
+            self.scheduler.measure(stage, (time.perf_counter() - start) * 1000.0, pixels)
+
+    def _region_priority(self, region: Dict) -> Tuple[bool, float]:
+        """Chave de ordenação: adiadas primeiro, depois maior acerto esperado por ms"""
+        x, y, w, h = region['bbox']
+        payoff = max(self.variant_stats.hit_rate(region['type'], name)
+                     / max(self.scheduler.expected_ms(f'refine:{name}', w * h), 0.1)
+                     for name in REFINE_ORDER)
+        return 'resume' not in region, -payoff
+
+    def _schedule_regions(self, regions: List[Dict], keep_unmatched: bool = True) -> List[Dict]:
+        """Mescla as regiões adiadas pelo frame anterior e ordena por prioridade
+
+        keep_unmatched=False descarta adiadas que não correspondem a nenhuma
+        região atual (trilhas já trazem a posição prevista).
+        """
+        deferred = {(r['type'], r['data']): r for r in self.scheduler.take_deferred()}
+        merged = []
+        for region in regions:
+            previous = deferred.pop((region['type'], region['data']), None)
+            if previous is not None:
+                # Mesmo código localizado de novo: bbox atual, versões pendentes
+                region = dict(region, resume=previous['resume'],
+                              deferred_frames=previous['deferred_frames'])
+            merged.append(region)
+        if keep_unmatched:
+            merged.extend(deferred.values())  # Não re-localizadas: bbox do frame anterior
+        merged.sort(key=self._region_priority)
+        return merged
+
+    def should_run_fallback(self, gray: np.ndarray, pixels: Optional[int] = None) -> bool:
+        """Limita o fallback por intervalo, por indício de código e pelo prazo do frame
+
+        Um corte pelo prazo não conta como execução: o fallback tenta de novo
+        no frame seguinte (e o agendador o força após cortes seguidos).
+        """
+        now = time.monotonic()
+        if (now - self._last_fallback) * 1000.0 < self.fallback_interval_ms:
+            self.fallback_skipped += 1
+            return False
+        if self.fallback_min_likelihood > 0 and code_likelihood(gray) < self.fallback_min_likelihood:
+            self.fallback_skipped += 1
+            return False
+        if not self._stage_allowed('fallback', pixels):
+            return False
+        self._last_fallback = now
+        self.fallback_runs += 1
+        return True
+
+    def _merge_refined(self, refined: list, codes: List[Dict], processed_codes: set):
+        """Adiciona resultados refinados em ordem, sem duplicatas"""
+        for best_result, variants in refined:
+            if variants is not None:
+                # ✅ CACHE das versões processadas (última região, como no loop serial)
+                self.enhanced_frame_cache = variants.built('enhanced')
+                self.gray_frame_cache = variants.built('sharpened')
+                self.binary_frame_cache = variants.built('binary')
+
+            # Se encontrou resultado refinado, adiciona
+            if best_result:
+                code_key = f"{best_result['type']}:{best_result['data']}"
+                if code_key not in processed_codes:
+                    processed_codes.add(code_key)
+                    codes.append(best_result)
+
+    def scan_many(self, frames: Iterable[np.ndarray]) -> List[List[Dict]]:
+        """Detecta códigos em uma sequência de frames (um resultado por frame)"""
+        return [self.scan(frame) for frame in frames]
+
+    # ==================== VALIDAÇÃO ====================
+    @staticmethod
+    def is_valid_code(code_type: str, code_data: str, bbox: tuple) -> bool:
+        """Valida se o código detectado é legítimo (não é ruído)"""
+        x, y, w, h = bbox
+
+        # ✅ REGRA 1: Tamanho mínimo REDUZIDO (permite códigos distantes)
+        if w < 15 or h < 8:  # Bem menor que antes (era 30x15) 15*8
+            return False
+
+        # ✅ REGRA 2: Conteúdo mínimo (códigos reais têm pelo menos 3 caracteres)
+        if len(code_data) < 3:
+            return False
+
+        # ✅ REGRA 3: Apenas caracteres imprimíveis (evita lixo binário)
+        if not all(32 <= ord(c) <= 126 for c in code_data):
+            return False
+
+        # ✅ REGRA 4: Validação específica DataBar (causa do WARNING)
+        if code_type in ['DATABAR', 'DATABAR_EXP', 'RSS14', 'RSS_EXP']:
+            # DataBar DEVE ser numérico e ter comprimento razoável
+            if not code_data.isdigit() or len(code_data) < 10:
+                return False
+
+        return True
+
+    # ==================== DECODIFICAÇÃO ====================
+    def set_symbologies(self, symbologies: Optional[Iterable[str]]):
+        """Define as simbologias habilitadas no zbar (None ou vazio = todas)
+
+        Os scanners de cada thread são recriados na próxima decodificação.
+        """
+        names = tuple(sorted({str(n).strip().upper() for n in symbologies or [] if str(n).strip()}))
+        if PYZBAR_AVAILABLE:
+            for name in names:
+                if name not in pyzbar.ZBarSymbol.__members__ and name != 'DATAMATRIX':
+                    print(f"⚠️ Simbologia desconhecida para o zbar: {name}", file=sys.stderr)
+        with self._scanner_lock:
+            self.symbologies = names
+            self._scanner_version += 1
+        self.reset_tracking()
+
+    def _thread_scanner(self) -> 'ZbarScanner':
+        """Scanner persistente da thread atual (recriado se a lista mudou)"""
+        scanner = getattr(self._local, 'scanner', None)
+        if scanner is None or self._local.version != self._scanner_version:
+            with self._scanner_lock:
+                version = self._scanner_version
+                symbologies = self.symbologies
+            scanner = ZbarScanner(symbologies)
+            self._local.scanner = scanner
+            self._local.version = version
+        return scanner
+
+    def decode_zbar(self, image: np.ndarray) -> list:
+        """Decodifica com o scanner zbar persistente da thread"""
+        if not PYZBAR_AVAILABLE:
+            return []
+
+        with self.stage_timer.measure('zbar'):
+            try:
+                return self._thread_scanner().decode(image)
+            except Exception:
+                return []
+
+    def decode_pyramid(self, image: np.ndarray, full_frame: bool = False) -> list:
+        """Decodificação coarse-to-fine: tenta na escala reduzida, depois na total
+
+        Resultados da escala reduzida têm rect/polygon convertidos para as
+        coordenadas da imagem original.
+
+        full_frame=True (frame inteiro, não um recorte): um código grande lido
+        na reduzida não garante que os pequenos também foram. A escala total
+        roda então só nos candidatos do localizador que nenhum resultado da
+        reduzida explica (o frame inteiro só se a reduzida não leu nada).
+        """
+        scale = self.pyramid_scale
+        if not (0 < scale < 1 and min(image.shape[:2]) * scale >= PYRAMID_MIN_SIDE):
+            return self.decode_zbar(image)
+
+        coarse = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        decoded = [_rescale_decoded(obj, 1.0 / scale) for obj in self.decode_zbar(coarse)]
+        if not decoded:
+            # ✅ Escala total só quando a reduzida falhou
+            return self.decode_zbar(image)
+        if not full_frame:
+            return decoded
+
+        gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        found = {(obj.type, obj.data) for obj in decoded}
+        for candidate in localize_codes(gray):
+            x, y, w, h = _expand_bbox(candidate['bbox'], 0.1, gray.shape)
+            if any(_overlaps((x, y, w, h), tuple(obj.rect)) for obj in decoded):
+                continue
+            for obj in self.decode_zbar(image[y:y+h, x:x+w]):
+                if (obj.type, obj.data) not in found:
+                    found.add((obj.type, obj.data))
+                    decoded.append(_translate_decoded(obj, x, y))
+        return decoded
+
+    @property
+    def datamatrix_enabled(self) -> bool:
+        """DataMatrix ativo: pylibdmtx instalado e simbologia permitida no modelo"""
+        return PYLIBDMTX_AVAILABLE and (not self.symbologies or 'DATAMATRIX' in self.symbologies)
+
+    def scan_datamatrix(self, frame: np.ndarray, known_codes: List[Dict],
+                        gray: Optional[np.ndarray] = None,
+                        candidates: Optional[List[Dict]] = None,
+                        tracked: Optional[List[Dict]] = None) -> List[Dict]:
+        """Busca DataMatrix nas regiões candidatas que o zbar não explicou
+
+        `tracked`: regiões de trilhas DataMatrix (ver CodeTracker.predict) que
+        estão entre os candidatos; recebem acerto/falha quando a busca termina
+        (no modo assíncrono, quando o lote for coletado).
+        """
+        if not self.datamatrix_enabled:
+            return []
+
+        if candidates is None:
+            if gray is None:
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            candidates = localize_codes(gray)
+
+        # Candidatos "matriz" primeiro (DataMatrix não tem barras paralelas)
+        ordered = sorted(candidates, key=lambda c: c['kind'] != 'matrix')
+
+        jobs = []
+        for candidate in ordered:
+            bbox = _expand_bbox(candidate['bbox'], 0.15, frame.shape)
+            if any(_overlaps(bbox, code['bbox']) for code in known_codes):
+                continue
+            x, y, w, h = bbox
+            jobs.append((bbox, frame[y:y+h, x:x+w].copy()))
+            if len(jobs) >= DMTX_MAX_CANDIDATES:
+                break
+
+        if not self.dmtx_async:
+            codes = self._decode_dmtx_jobs(jobs)
+            if tracked:
+                self.tracker.resolve(tracked, {code['data'] for code in codes})
+            return codes
+
+        # ✅ Modo assíncrono: agenda o lote atual e entrega o que já terminou
+        if self._dmtx_worker is None:
+            self._dmtx_worker = DmtxWorker(self._decode_dmtx_jobs)
+        if jobs and self._dmtx_worker.submit(jobs, self._frame_seq) and tracked:
+            self._dmtx_pending_tracks[self._frame_seq] = tracked
+        return self.collect_datamatrix(gray if gray is not None else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+
+    def collect_datamatrix(self, gray: np.ndarray) -> List[Dict]:
+        """Resultados DataMatrix assíncronos prontos, com bbox no frame atual
+
+        Um lote de até um frame atrás é entregue como está; mais antigo, o
+        código é procurado (correlação) em volta da posição original e
+        reposicionado, ou descartado se não estiver mais lá.
+        """
+        if self._dmtx_worker is None:
+            return []
+        codes = []
+        for frame_seq, batch in self._dmtx_worker.collect():
+            tracked = self._dmtx_pending_tracks.pop(frame_seq, None)
+            if tracked and self.tracker is not None:
+                self.tracker.resolve(tracked, {code['data'] for code in batch})
+            for code in batch:
+                if self._frame_seq - frame_seq > 1:
+                    code = _reanchor_code(code, gray)
+                    if code is None:
+                        continue
+                codes.append(code)
+        return codes
+
+    def _decode_dmtx_jobs(self, jobs: list) -> List[Dict]:
+        """Decodifica uma lista de (bbox, recorte) com pylibdmtx"""
+        codes = []
+        for (bx, by, bw, bh), crop in jobs:
+            with self.stage_timer.measure('dmtx'):
+                decoded = decode_dmtx_crop(crop, self.dmtx_timeout_ms, self.dmtx_shrink)
+
+            for data, (x, y, w, h) in decoded:
+                # Usa o bbox do libdmtx se coerente; senão o do candidato
+                if w < 4 or h < 4:
+                    x, y, w, h = 0, 0, bw, bh
+                bbox = (bx + x, by + y, w, h)
+                if not self.is_valid_code('DATAMATRIX', data, bbox):
+                    continue
+
+                x1, y1, w1, h1 = bbox
+                variants = RegionVariants(crop[y:y+h, x:x+w], self.stage_timer)
+                codes.append({
+                    'type': 'DATAMATRIX',
+                    'data': data,
+                    'bbox': bbox,
+                    'points': [Point(x1, y1), Point(x1 + w1, y1), Point(x1 + w1, y1 + h1), Point(x1, y1 + h1)],
+                    'detected_on': 'dmtx_candidate',
+                    'variants': variants    # Versões de PDI sob demanda (code_variant)
+                })
+                break
+        return codes
+
+    # ==================== ETAPAS DO PIPELINE ====================
+    def locate_regions(self, frame: np.ndarray, gray: Optional[np.ndarray] = None,
+                       candidates: Optional[List[Dict]] = None) -> List[Dict]:
+        """ETAPA 1: Localiza códigos no frame em escala de cinza
+
+        Sem candidatos, decodifica o frame inteiro; com candidatos do
+        localizador, decodifica apenas os recortes (com margem) de cada um.
+        """
+        # Usa imagem em escala de cinza para localizar códigos rapidamente
+        if gray is None:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+        if candidates is None:
+            decoded = [((0, 0), obj) for obj in self.decode_pyramid(gray, full_frame=True)]
+        else:
+            # ✅ Só recortes pequenos chegam ao zbar (em paralelo no pool)
+            crops = [_expand_bbox(c['bbox'], 0.1, gray.shape) for c in candidates]
+
+            def decode_crop(bbox):
+                x, y, w, h = bbox
+                return [((x, y), obj) for obj in self.decode_pyramid(gray[y:y+h, x:x+w])]
+
+            decoded = [item for items in self._map(decode_crop, crops) for item in items]
+
+        detected_regions = []  # Armazena regiões detectadas para processamento
+        seen = set()
+
+        for (ox, oy), obj in decoded:
+            try:
+                data_key = obj.data.decode('utf-8', errors='ignore')
+                x, y, w, h = obj.rect
+                x, y = x + ox, y + oy
+
+                # Candidatos sobrepostos podem decodificar o mesmo código
+                if (obj.type, data_key) in seen:
+                    continue
+
+                # Valida se não é ruído
+                if not self.is_valid_code(obj.type, data_key, (x, y, w, h)):
+                    continue
+
+                # Armazena região para processamento refinado
+                seen.add((obj.type, data_key))
+                detected_regions.append({
+                    'type': obj.type,
+                    'data': data_key,
+                    'bbox': (x, y, w, h),
+                    'polygon': [Point(px + ox, py + oy) for px, py in obj.polygon],
+                    'method': 'initial' if candidates is None else 'localizer'
+                })
+            except Exception:
+                continue
+
+        return detected_regions
+
+    def refine_region(self, frame: np.ndarray, region: Dict) -> Tuple[Optional[Dict], Optional[RegionVariants]]:
+        """ETAPAS 2-5: Recorta, retifica, aplica PDI e re-decodifica uma região
+
+        Não altera o estado do motor (pode rodar em paralelo). Retorna
+        (melhor_resultado, RegionVariants).
+        """
+        x, y, w, h = region['bbox']
+        polygon = region['polygon']
+
+        # ✅ MARGEM DE SEGURANÇA: Expande região em 20% para não cortar bordas
+        margin_x = int(w * 0.2)
+        margin_y = int(h * 0.2)
+
+        x1 = max(0, x - margin_x)
+        y1 = max(0, y - margin_y)
+        x2 = min(frame.shape[1], x + w + margin_x)
+        y2 = min(frame.shape[0], y + h + margin_y)
+
+        # ✅ RECORTE da região detectada (a retificação gera uma imagem nova)
+        roi = frame[y1:y2, x1:x2]
+
+        if roi.size == 0:
+            return None, None
+
+        # ============ ETAPA 3: RETIFICAÇÃO DE PERSPECTIVA ============
+        try:
+            # Ajusta coordenadas do polígono para o ROI
+            polygon_adjusted = []
+            for point in polygon:
+                px = point.x - x1
+                py = point.y - y1
+                polygon_adjusted.append([px, py])
+
+            polygon_adjusted = np.array(polygon_adjusted, dtype=np.float32)
+
+            # Calcula largura e altura do código retificado
+            # Usa a distância entre pontos para preservar proporções
+            width = int(max(
+                np.linalg.norm(polygon_adjusted[0] - polygon_adjusted[1]),
+                np.linalg.norm(polygon_adjusted[2] - polygon_adjusted[3])
+            ))
+            height = int(max(
+                np.linalg.norm(polygon_adjusted[1] - polygon_adjusted[2]),
+                np.linalg.norm(polygon_adjusted[3] - polygon_adjusted[0])
+            ))
+
+            # ✅ TAMANHO MÍNIMO: Garante resolução suficiente para leitura
+            width = max(width, 100)
+            height = max(height, 50)
+
+            # Pontos destino (retângulo perfeito)
+            dst_points = np.array([
+                [0, 0],
+                [width - 1, 0],
+                [width - 1, height - 1],
+                [0, height - 1]
+            ], dtype=np.float32)
+
+            # ✅ MATRIZ DE TRANSFORMAÇÃO de perspectiva
+            matrix = cv2.getPerspectiveTransform(polygon_adjusted, dst_points)
+
+            # ✅ RETIFICAÇÃO: Corrige distorção angular
+            with self.stage_timer.measure('rectify'):
+                rectified = cv2.warpPerspective(roi, matrix, (width, height))
+
+        except Exception as e:
+            # Se retificação falhar, usa ROI original
+            print(f"⚠️ Retificação falhou: {e}", file=sys.stderr)
+            rectified = roi.copy()
+
+        # ✅ CACHE: região idêntica à de um frame anterior → resultado memorizado
+        # (a configuração de decodificação faz parte da chave, e também o
+        # conteúdo lido na ETAPA 1: códigos 1D de números de série seguidos
+        # podem ter o mesmo hash e não podem herdar o resultado um do outro)
+        if self.result_cache is not None:
+            cache_key = (region['type'], region.get('data'), self._scanner_version,
+                         self.pyramid_scale, self.thorough)
+            phash = perceptual_hash(rectified)
+            cached = self.result_cache.get(cache_key, phash, self.stage_timer)
+            if cached is not None:
+                cached_result, cached_variants = cached
+                if cached_result is not None:
+                    cached_result = dict(cached_result, bbox=region['bbox'], points=region['polygon'],
+                                         variants=cached_variants)
+                return cached_result, cached_variants
+
+        # ============ ETAPA 4: PIPELINE DE PDI NA REGIÃO RETIFICADA ============
+        # ✅ Versões construídas sob demanda (só quando a anterior falhou)
+        variants = RegionVariants(rectified, self.stage_timer)
+
+        # ============ ETAPA 5: RE-DETECÇÃO COM ALTA PRECISÃO ============
+
+        # Tenta detectar nas versões processadas (ordem de prioridade)
+        best_result = None
+        best_confidence = 0
+
+        symbology = region['type']
+        scheduler = self.scheduler
+        pixels = rectified.shape[0] * rectified.shape[1]
+        if self.adaptive:
+            # Com prazo por frame: ordem por acerto por ms esperado
+            cost = (lambda name: scheduler.expected_ms(f'refine:{name}', pixels)) if scheduler else None
+            refine_order = self.variant_stats.order(symbology, REFINE_ORDER, cost)
+        else:
+            refine_order = REFINE_ORDER
+
+        # Região adiada: retoma pelas versões que ficaram sem tentar
+        resume = region.get('resume')
+        if resume:
+            refine_order = tuple(resume) + tuple(v for v in refine_order if v not in resume)
+
+        cut = False
+        for index, frame_type in enumerate(refine_order):
+            # ✅ PRAZO: versão que não cabe no tempo restante fica para o próximo frame
+            if scheduler is not None and not scheduler.allows(f'refine:{frame_type}', pixels):
+                cut = True
+                if best_result is None:
+                    scheduler.defer(dict(region, resume=refine_order[index:]))
+                break
+
+            start = time.perf_counter()
+            processed = variants.get(frame_type)
+            hit = False
+
+            for obj in self.decode_pyramid(processed):
+                try:
+                    refined_data = obj.data.decode('utf-8', errors='ignore')
+
+                    # Valida resultado
+                    if len(refined_data) < 3:
+                        continue
+                    hit = True
+
+                    # ✅ CRITÉRIO DE CONFIANÇA: Prefere detecções com maior área
+                    confidence = obj.rect.width * obj.rect.height
+
+                    if confidence > best_confidence:
+                        best_confidence = confidence
+                        best_result = {
+                            'type': obj.type,
+                            'data': refined_data,
+                            'bbox': region['bbox'],
+                            'points': region['polygon'],
+                            'detected_on': f'refined_{frame_type}',
+                        }
+                except Exception:
+                    continue
+
+            self.variant_stats.record(symbology, frame_type, hit)
+            if scheduler is not None:
+                scheduler.measure(f'refine:{frame_type}', (time.perf_counter() - start) * 1000.0, pixels)
+
+            # ✅ EARLY EXIT: Para na primeira versão que decodificou
+            # (modo thorough mantém a seleção por maior área entre todas)
+            if best_result is not None and not self.thorough:
+                break
+
+        if best_result is not None:
+            # ✅ Só a referência às versões: a miniatura calcula a que for exibida
+            best_result['variants'] = variants
+
+        # (refinamento cortado pelo prazo não é definitivo: não vai ao cache)
+        if self.result_cache is not None and not cut:
+            self.result_cache.put(cache_key, phash, best_result, variants)
+
+        return best_result, variants
+
+    def scan_full_frame(self, frame: np.ndarray) -> List[Dict]:
+        """FALLBACK: Pipeline PDI no frame completo (como backup)"""
+        codes = []
+
+        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        lab = cv2.cvtColor(frame, cv2.COLOR_BGR2LAB)
+        lab[:, :, 0] = clahe.apply(lab[:, :, 0])
+        enhanced_frame = cv2.cvtColor(lab, cv2.COLOR_LAB2BGR)
+
+        gray = cv2.cvtColor(enhanced_frame, cv2.COLOR_BGR2GRAY)
+
+        binary = cv2.adaptiveThreshold(
+            gray, 255,
+            cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+            cv2.THRESH_BINARY,
+            blockSize=11,
+            C=2
+        )
+
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+        denoised = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel, iterations=1)
+
+        # Cache para miniaturas
+        self.enhanced_frame_cache = enhanced_frame
+        self.gray_frame_cache = gray
+        self.binary_frame_cache = denoised
+
+        # Tenta detectar
+        frames_to_try = [
+            ('binary', denoised),
+            ('enhanced', enhanced_frame),
+            ('gray', gray)
+        ]
+
+        detected_data = set()
+
+        # ✅ As 3 variantes são decodificadas em paralelo e mescladas na ordem acima
+        decoded_variants = self._map(lambda item: self.decode_pyramid(item[1], full_frame=True),
+                                     frames_to_try)
+
+        for (frame_type, processed_frame), decoded_objects in zip(frames_to_try, decoded_variants):
+            for obj in decoded_objects:
+                try:
+                    data_key = obj.data.decode('utf-8', errors='ignore')
+                    x, y, w, h = obj.rect
+
+                    if not self.is_valid_code(obj.type, data_key, (x, y, w, h)):
+                        continue
+
+                    if data_key not in detected_data:
+                        detected_data.add(data_key)
+
+                        codes.append({
+                            'type': obj.type,
+                            'data': data_key,
+                            'bbox': (x, y, w, h),
+                            'points': obj.polygon,
+                            'detected_on': f'fullframe_{frame_type}',
+                            # ✅ Recortes (sem cópia) das versões já calculadas no frame completo
+                            # (o fallback não aguça: 'gray' mostra o cinza puro)
+                            'variants': RegionVariants.precomputed(
+                                frame[y:y+h, x:x+w],
+                                enhanced=enhanced_frame[y:y+h, x:x+w],
+                                gray=gray[y:y+h, x:x+w],
+                                sharpened=gray[y:y+h, x:x+w],
+                                binary=denoised[y:y+h, x:x+w])
+                        })
+                except Exception:
+                    continue
+
+        return codes
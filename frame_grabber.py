@@ -0,0 +1,137 @@
+"""
+=======================================================================================
+CAPTURA "LATEST-FRAME-WINS" (sem dependência de PyQt5)
+=======================================================================================
+Thread dedicada que chama camera.grab() continuamente, esvaziando o buffer do
+driver (V4L2), e só executa camera.retrieve() (decodificação MJPEG) quando o
+detector pede um frame. Assim:
+  • frames que seriam descartados nunca pagam o custo de decodificação
+  • o detector sempre recebe a imagem mais recente, com o timestamp da captura
+=======================================================================================
+"""
+
+import sys
+import time
+import threading
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+
+class LatestFrameGrabber:
+    """Grabber contínuo sobre um cv2.VideoCapture (ou objeto compatível)
+
+    O VideoCapture passa a ser acessado SOMENTE pela thread do grabber.
+    Outras threads que precisam ajustar a câmera (ex: camera.set) devem usar
+    call_soon(), que executa a função entre dois grab().
+    """
+
+    def __init__(self, capture):
+        self.capture = capture
+        self.running = False
+        self._thread: Optional[threading.Thread] = None
+
+        self._cond = threading.Condition()
+        self._pending_calls = []
+        self._request = None         # Pedido de frame pendente (min_seq)
+        self._response = None        # (ok, frame, timestamp) entregue ao leitor
+
+        # Estatísticas
+        self.frames_grabbed = 0      # Total de grab() bem-sucedidos
+        self.frames_retrieved = 0    # Total de retrieve() (frames decodificados)
+        self.last_timestamp = 0.0    # time.monotonic() do último grab()
+        self._last_read_seq = 0      # Número do último frame entregue
+
+    @property
+    def frames_skipped(self) -> int:
+        """Frames capturados que nunca foram decodificados"""
+        return self.frames_grabbed - self.frames_retrieved
+
+    def start(self):
+        """Inicia a thread de captura"""
+        if self.running:
+            return
+        self.running = True
+        self._thread = threading.Thread(target=self._loop, name="grabber", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Para a thread de captura (não libera o VideoCapture)"""
+        self.running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def call_soon(self, func: Callable[[], None]):
+        """Agenda func() para executar na thread do grabber, entre dois grab()"""
+        with self._cond:
+            self._pending_calls.append(func)
+
+    def read(self, timeout: float = 1.0, min_new_frames: int = 1) -> Tuple[bool, Optional[np.ndarray], float]:
+        """Retorna (ok, frame, timestamp) do frame mais recente
+
+        Bloqueia até que pelo menos `min_new_frames` novos frames tenham sido
+        capturados desde a última leitura (usado no modo rápido) e retorna o
+        primeiro grab() que satisfaz a condição. O timestamp é time.monotonic()
+        no instante da captura.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._request = self._last_read_seq + max(1, min_new_frames)
+            self._response = None
+            while self._response is None:
+                remaining = deadline - time.monotonic()
+                if not self.running or remaining <= 0:
+                    self._request = None
+                    return False, None, 0.0
+                self._cond.wait(remaining)
+            response = self._response
+            self._response = None
+            return response
+
+    def _loop(self):
+        """Loop da thread: grab() contínuo, retrieve() somente sob demanda"""
+        while self.running:
+            # Executa ajustes agendados (ex: apply_pdi_params)
+            with self._cond:
+                calls, self._pending_calls = self._pending_calls, []
+            for func in calls:
+                try:
+                    func()
+                except Exception as e:
+                    print(f"⚠️ Erro em chamada agendada no grabber: {e}", file=sys.stderr)
+
+            try:
+                ok = self.capture.grab()
+            except Exception:
+                ok = False
+            if not ok:
+                time.sleep(0.01)
+                continue
+
+            timestamp = time.monotonic()
+
+            with self._cond:
+                self.frames_grabbed += 1
+                self.last_timestamp = timestamp
+
+                # ✅ Só decodifica se alguém está esperando por este frame
+                if self._request is None or self.frames_grabbed < self._request:
+                    continue
+
+                self._request = None
+                try:
+                    ok, frame = self.capture.retrieve()
+                except Exception:
+                    ok, frame = False, None
+                if not ok:
+                    # Mantém o pedido para o próximo grab()
+                    self._request = self.frames_grabbed + 1
+                    continue
+
+                self.frames_retrieved += 1
+                self._last_read_seq = self.frames_grabbed
+                self._response = (True, frame, timestamp)
+                self._cond.notify_all()
@@ -0,0 +1,319 @@
+"""
+=======================================================================================
+FONTES DE FRAMES (sem dependência de PyQt5)
+=======================================================================================
+Interface comum para tudo que entrega frames ao pipeline, compatível com
+cv2.VideoCapture (grab / retrieve / read / set / get / release / isOpened),
+para que LatestFrameGrabber e CameraThread funcionem com qualquer fonte:
+  • CameraSource       → câmera V4L2 (configuração da Pcyes FHD-03)
+  • VideoFileSource    → vídeo gravado, em tempo real ou o mais rápido possível
+  • ImageFolderSource  → pasta de imagens (em ciclo)
+  • SyntheticSource    → QR codes gerados em movimento (sem hardware)
+
+Especificação textual (GUI, CLI):
+    0 | camera:0             câmera 0
+    video:linha3.mp4         vídeo (ou só o caminho de um arquivo de vídeo)
+    folder:fotos/            pasta de imagens (ou só o caminho da pasta)
+    synthetic[:TXT1,TXT2]    gerador sintético com os textos dados
+=======================================================================================
+"""
+
+import time
+import cv2
+import numpy as np
+from pathlib import Path
+from typing import Optional, List, Sequence, Tuple
+
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.webp'}
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mkv', '.mov', '.m4v', '.webm', '.mjpeg', '.mjpg'}
+
+
+class _Pacer:
+    """Espaça chamadas na taxa de `fps` (tempo real); fps <= 0 não espera"""
+
+    def __init__(self, fps: float):
+        self.period = 1.0 / fps if fps and fps > 0 else 0.0
+        self._next = 0.0
+
+    def wait(self):
+        if self.period <= 0:
+            return
+        now = time.monotonic()
+        if self._next > now:
+            time.sleep(self._next - now)
+            now = self._next
+        # Atrasos não acumulam: o próximo slot conta a partir de agora
+        self._next = max(self._next + self.period, now)
+
+
+class FrameSource:
+    """Fonte de frames com a interface do cv2.VideoCapture
+
+    set() é ignorado (retorna False) em fontes que não são câmera, então
+    apply_pdi_params() pode ser chamado com qualquer fonte.
+    """
+
+    description = "fonte"
+    warmup_ms = 0        # Espera antes da detecção (ex: autofoco da câmera)
+
+    def isOpened(self) -> bool:
+        return False
+
+    def grab(self) -> bool:
+        return False
+
+    def retrieve(self) -> Tuple[bool, Optional[np.ndarray]]:
+        return False, None
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if not self.grab():
+            return False, None
+        return self.retrieve()
+
+    def set(self, prop: int, value) -> bool:
+        return False
+
+    def get(self, prop: int) -> float:
+        return 0.0
+
+    def release(self):
+        pass
+
+
+class CameraSource(FrameSource):
+    """Câmera via V4L2 (cai para o backend padrão) com a configuração da FHD-03"""
+
+    warmup_ms = 1000     # Autofoco estabilizar
+
+    def __init__(self, index: int):
+        self.index = index
+        self.description = f"Câmera {index}"
+
+        self.capture = cv2.VideoCapture(index, cv2.CAP_V4L2)  # ✅ Usa V4L2 no Linux
+        if not self.capture.isOpened():
+            # Tenta com backend padrão se V4L2 falhar
+            self.capture = cv2.VideoCapture(index)
+            if not self.capture.isOpened():
+                return
+
+        # ✅ OTIMIZADO: Configuração específica para FHD-03
+        # Usa 720p para melhor performance (a detecção não precisa de 1080p)
+        self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
+        self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+        self.capture.set(cv2.CAP_PROP_FPS, 30)
+        self.capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+        # ✅ IMPORTANTE: Desativa autofoco inicial para evitar delay
+        # Será reativado pelos parâmetros do usuário
+        self.capture.set(cv2.CAP_PROP_AUTOFOCUS, 0)
+
+        # ✅ Configura codec MJPEG para melhor performance
+        self.capture.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+
+        # Aguarda 500ms para câmera estabilizar
+        time.sleep(0.5)
+
+    def isOpened(self) -> bool:
+        return self.capture.isOpened()
+
+    def grab(self) -> bool:
+        return self.capture.grab()
+
+    def retrieve(self):
+        return self.capture.retrieve()
+
+    def read(self):
+        return self.capture.read()
+
+    def set(self, prop: int, value) -> bool:
+        return self.capture.set(prop, value)
+
+    def get(self, prop: int) -> float:
+        return self.capture.get(prop)
+
+    def release(self):
+        self.capture.release()
+
+
+class VideoFileSource(FrameSource):
+    """Vídeo gravado: realtime=True respeita o FPS do arquivo, False entrega
+    o mais rápido possível (benchmarks, varredura offline)"""
+
+    def __init__(self, path: str, realtime: bool = True, loop: bool = False):
+        self.path = str(path)
+        self.loop = loop
+        self.description = f"Vídeo {Path(self.path).name}"
+        self.capture = cv2.VideoCapture(self.path)
+        fps = self.capture.get(cv2.CAP_PROP_FPS) if self.capture.isOpened() else 0.0
+        self._pacer = _Pacer((fps or 30.0) if realtime else 0.0)
+
+    def isOpened(self) -> bool:
+        return self.capture.isOpened()
+
+    def grab(self) -> bool:
+        self._pacer.wait()
+        if self.capture.grab():
+            return True
+        if not self.loop:
+            return False
+        self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        return self.capture.grab()
+
+    def retrieve(self):
+        return self.capture.retrieve()
+
+    def get(self, prop: int) -> float:
+        return self.capture.get(prop)
+
+    def release(self):
+        self.capture.release()
+
+
+class ImageFolderSource(FrameSource):
+    """Pasta de imagens entregues em ordem (em ciclo se loop=True)
+
+    A imagem só é lida do disco em retrieve(), como a decodificação MJPEG da
+    câmera: frames pulados pelo grabber não custam nada.
+    """
+
+    def __init__(self, path: str, fps: float = 10.0, realtime: bool = True, loop: bool = True):
+        self.path = Path(path)
+        self.loop = loop
+        self.description = f"Pasta {self.path.name}"
+        self.files: List[Path] = sorted(p for p in self.path.rglob('*')
+                                        if p.suffix.lower() in IMAGE_EXTENSIONS)
+        self.fps = fps
+        self._pacer = _Pacer(fps if realtime else 0.0)
+        self._index = -1
+        self._size = (0, 0)
+
+    def isOpened(self) -> bool:
+        return bool(self.files)
+
+    def grab(self) -> bool:
+        if not self.files:
+            return False
+        self._pacer.wait()
+        if self._index + 1 >= len(self.files):
+            if not self.loop:
+                return False
+            self._index = -1
+        self._index += 1
+        return True
+
+    def retrieve(self):
+        if not 0 <= self._index < len(self.files):
+            return False, None
+        frame = cv2.imread(str(self.files[self._index]), cv2.IMREAD_COLOR)
+        if frame is None:
+            return False, None
+        self._size = (frame.shape[1], frame.shape[0])
+        return True, frame
+
+    def get(self, prop: int) -> float:
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(len(self.files))
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self._index + 1)
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self._size[0])
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self._size[1])
+        return 0.0
+
+
+class SyntheticSource(FrameSource):
+    """Gerador de QR codes em movimento sobre fundo cinza, com ruído de sensor
+
+    Permite exercitar o pipeline inteiro sem câmera (servidores de build).
+    Cada texto vira um QR (cv2.QRCodeEncoder) que se desloca em vaivém.
+    """
+
+    def __init__(self, texts: Sequence[str] = ("SINTETICO-001",), size: Tuple[int, int] = (1280, 720),
+                 fps: float = 30.0, realtime: bool = True, code_size: int = 180,
+                 motion: float = 4.0, noise: float = 3.0, seed: int = 0):
+        self.texts = list(texts) or ["SINTETICO-001"]
+        self.size = size
+        self.fps = fps
+        self.motion = motion
+        self.noise = noise
+        self.description = f"Sintético ({len(self.texts)} código(s))"
+        self._pacer = _Pacer(fps if realtime else 0.0)
+        self._rng = np.random.default_rng(seed)
+        self._frame_index = -1
+
+        encoder = cv2.QRCodeEncoder.create()
+        self._codes = []
+        for text in self.texts:
+            qr = cv2.resize(encoder.encode(text), (code_size, code_size), interpolation=cv2.INTER_NEAREST)
+            qr = cv2.copyMakeBorder(qr, 16, 16, 16, 16, cv2.BORDER_CONSTANT, value=255)
+            self._codes.append(cv2.cvtColor(qr, cv2.COLOR_GRAY2BGR))
+
+    def isOpened(self) -> bool:
+        return True
+
+    def grab(self) -> bool:
+        self._pacer.wait()
+        self._frame_index += 1
+        return True
+
+    def retrieve(self):
+        width, height = self.size
+        frame = np.full((height, width, 3), 150, np.uint8)
+        slots = len(self._codes)
+        for slot, code in enumerate(self._codes):
+            side = code.shape[0]
+            span = max(1, width // slots - side)
+            # Vaivém horizontal de cada código dentro da sua faixa
+            phase = (self._frame_index * self.motion + slot * 37) % (2 * span)
+            offset = int(phase if phase < span else 2 * span - phase)
+            x = min(width - side, slot * (width // slots) + offset)
+            y = max(0, (height - side) // 2)
+            frame[y:y + side, x:x + side] = code[:height - y, :width - x]
+        if self.noise > 0:
+            noise = self._rng.normal(0.0, self.noise, frame.shape[:2]).astype(np.int16)
+            frame = np.clip(frame.astype(np.int16) + noise[..., None], 0, 255).astype(np.uint8)
+        return True, frame
+
+    def get(self, prop: int) -> float:
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.size[0])
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.size[1])
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self._frame_index + 1)
+        return 0.0
+
+
+def open_source(spec: str, realtime: bool = True, loop: bool = False) -> FrameSource:
+    """Cria uma fonte a partir da especificação textual (ver cabeçalho)
+
+    `loop` reinicia vídeos e pastas ao chegar ao fim (interface ao vivo).
+    """
+    spec = str(spec).strip()
+    kind, _, value = spec.partition(':')
+    kind = kind.lower()
+
+    if spec.isdigit():
+        return CameraSource(int(spec))
+    if kind == 'camera':
+        return CameraSource(int(value or 0))
+    if kind == 'synthetic':
+        texts = [t.strip() for t in value.split(',') if t.strip()]
+        return SyntheticSource(texts or ("SINTETICO-001",), realtime=realtime)
+    if kind == 'video':
+        return VideoFileSource(value, realtime=realtime, loop=loop)
+    if kind == 'folder':
+        return ImageFolderSource(value, realtime=realtime, loop=loop)
+
+    path = Path(spec)
+    if path.is_dir():
+        return ImageFolderSource(spec, realtime=realtime, loop=loop)
+    if path.suffix.lower() in VIDEO_EXTENSIONS:
+        return VideoFileSource(spec, realtime=realtime, loop=loop)
+    raise ValueError(f"Fonte desconhecida: {spec}")
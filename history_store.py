@@ -0,0 +1,76 @@
+"""
+=======================================================================================
+HISTÓRICO DE DETECÇÕES EM DISCO (sem dependência de PyQt5)
+=======================================================================================
+Registro append-only de uma sessão em JSON Lines (uma detecção por linha),
+com acesso aleatório por número da linha:
+  • append_many() grava um lote inteiro de uma vez (um write + flush)
+  • read(start, count) lê só as linhas pedidas (índice de offsets em memória,
+    8 bytes por entrada: ~4 MB para 500 mil detecções)
+O arquivo também serve de trilha de auditoria do turno.
+=======================================================================================
+"""
+
+import json
+import tempfile
+from array import array
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+HISTORY_DIR = "historico"
+
+
+class HistoryStore:
+    """Histórico da sessão em disco com leitura por faixa de linhas
+
+    Não é thread-safe: a interface só o acessa pela thread da GUI.
+    Se o diretório não puder ser criado, usa um arquivo temporário.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        if path is None:
+            path = Path(HISTORY_DIR) / f"historico_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+        self.path: Optional[Path] = Path(path)
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, 'a+b')
+        except OSError as e:
+            print(f"⚠️ Histórico em arquivo temporário ({self.path}: {e})")
+            self.path = None
+            self._file = tempfile.TemporaryFile('a+b')
+        self._file.seek(0, 2)
+        self._offsets = array('q')    # Início de cada linha no arquivo
+        self._end = self._file.tell()
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def append_many(self, entries: Sequence[Dict]):
+        """Grava um lote de entradas no fim do arquivo"""
+        if not entries:
+            return
+        chunks = []
+        position = self._end
+        for entry in entries:
+            line = (json.dumps(entry, ensure_ascii=False) + "\n").encode('utf-8')
+            self._offsets.append(position)
+            position += len(line)
+            chunks.append(line)
+        self._file.write(b"".join(chunks))
+        self._file.flush()
+        self._end = position
+
+    def read(self, start: int, count: int) -> List[Dict]:
+        """Entradas [start, start + count) (limitadas ao que existe)"""
+        start = max(0, start)
+        stop = min(len(self._offsets), start + count)
+        if start >= stop:
+            return []
+        end = self._offsets[stop] if stop < len(self._offsets) else self._end
+        self._file.seek(self._offsets[start])
+        data = self._file.read(end - self._offsets[start])
+        return [json.loads(line) for line in data.decode('utf-8').splitlines()]
+
+    def close(self):
+        self._file.close()
@@ -0,0 +1,199 @@
+"""
+=======================================================================================
+MÉTRICAS DA ESTAÇÃO (formato texto do Prometheus, sem dependência de PyQt5)
+=======================================================================================
+Registro de contadores e histogramas + servidor HTTP opcional (GET /metrics)
+para o monitoramento da planta:
+  • o servidor roda na sua própria thread (nunca na de captura/decodificação)
+  • valores que já existem em outros objetos (frames capturados, filas...) são
+    lidos só no momento da coleta, por funções registradas com add_collector()
+  • desativado (sem --metrics-port) nada é criado: CameraThread.metrics = None
+
+Uso:
+    registry = MetricsRegistry()
+    registry.describe('codedetect_codes_total', 'counter', "Códigos emitidos")
+    registry.inc('codedetect_codes_total', symbology='QRCODE')
+    server = MetricsServer(registry, port=9108).start()
+=======================================================================================
+"""
+
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Faixas (segundos) dos histogramas padrão
+LATENCY_BUCKETS_S = (0.005, 0.01, 0.02, 0.033, 0.05, 0.1, 0.2, 0.5, 1.0)
+CYCLE_BUCKETS_S = (1, 2, 5, 10, 15, 20, 30, 60, 120)
+
+DEFAULT_METRICS_PORT = 9108
+
+# (nome, rótulos, valor) devolvido pelos coletores
+Sample = Tuple[str, Dict[str, str], float]
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = [*labels, extra] if extra is not None else list(labels)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in items) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Histogram:
+    """Histograma cumulativo (contagens desde o início do processo)"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)   # Última faixa: +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Contadores, gauges e histogramas com rótulos; seguro entre threads
+
+    inc()/observe() custam um lock e uma soma: podem ser chamados da thread
+    de decodificação. A formatação (render) só acontece na thread do servidor.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._meta: Dict[str, Tuple[str, str]] = {}          # nome → (tipo, ajuda)
+        self._values: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._buckets: Dict[str, Sequence[float]] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+
+    def describe(self, name: str, kind: str, help_text: str, buckets: Optional[Sequence[float]] = None):
+        """Declara uma métrica: kind = 'counter', 'gauge' ou 'histogram'"""
+        with self._lock:
+            self._meta[name] = (kind, help_text)
+            if kind == 'histogram':
+                self._buckets[name] = buckets or LATENCY_BUCKETS_S
+                self._histograms.setdefault(name, {})
+            else:
+                self._values.setdefault(name, {})
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._values.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values.setdefault(name, {})[key] = float(value)
+
+    def observe(self, name: str, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(self._buckets.get(name, LATENCY_BUCKETS_S))
+            histogram.observe(value)
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]):
+        """Registra uma função chamada a cada coleta, devolvendo (nome, rótulos, valor)
+
+        As métricas devolvidas devem ter sido declaradas com describe().
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Todas as métricas no formato texto de exposição do Prometheus"""
+        with self._lock:
+            collectors = list(self._collectors)
+        collected: Dict[str, Dict[LabelKey, float]] = {}
+        for collector in collectors:
+            try:
+                for name, labels, value in collector():
+                    collected.setdefault(name, {})[tuple(sorted(labels.items()))] = float(value)
+            except Exception as e:
+                # Um coletor com problema não derruba os demais
+                print(f"⚠️ Erro na coleta de métricas: {e}")
+
+        lines = []
+        with self._lock:
+            for name, (kind, help_text) in sorted(self._meta.items()):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == 'histogram':
+                    for key, histogram in sorted(self._histograms.get(name, {}).items()):
+                        cumulative = 0
+                        for bound, count in zip((*histogram.buckets, float('inf')), histogram.counts):
+                            cumulative += count
+                            labels = _format_labels(key, ('le', _format_value(bound)))
+                            lines.append(f"{name}_bucket{labels} {cumulative}")
+                        lines.append(f"{name}_sum{_format_labels(key)} {_format_value(histogram.total)}")
+                        lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+                    continue
+                series = {**self._values.get(name, {}), **collected.get(name, {})}
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry = None
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Uma linha por coleta poluiria o terminal
+
+
+class MetricsServer:
+    """Servidor HTTP de /metrics em thread daemon"""
+
+    def __init__(self, registry: MetricsRegistry, port: int = DEFAULT_METRICS_PORT, host: str = "127.0.0.1"):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "MetricsServer":
+        handler = type('MetricsHandler', (_MetricsHandler,), {'registry': self.registry})
+        self._server = ThreadingHTTPServer((self.host, self.port), handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]   # port=0 → porta livre escolhida pelo SO
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metricas", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None